@@ -0,0 +1,76 @@
+"""
+Microbenchmark: per-document cost of the list-route read path.
+
+before: build models from the Mongo dicts, then let FastAPI dump, re-validate
+        against response_model and JSON-encode them (what the routes did)
+after:  TrustedReader straight from the projected dicts to JSON bytes
+
+    python bench_serialization.py [documents] [repeats]
+"""
+import json
+import sys
+import timeit
+from typing import List
+
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+from models import Project, MediaImage, trusted_reader
+
+
+def sample_projects(count: int) -> List[dict]:
+    return [
+        Project(
+            title=f'Proiect {i}',
+            description='Amplificator audio clasa D cu filtru activ',
+            longDescription='Descriere detaliată a proiectului. ' * 20,
+            category='electronics',
+            image=f'/api/uploads/{i}.jpg',
+            gallery=[f'/api/uploads/{i}-{g}.jpg' for g in range(6)],
+            technologies=['KiCad', 'STM32', 'C'],
+            featured=i % 5 == 0,
+        ).model_dump()
+        for i in range(count)
+    ]
+
+
+def sample_media(count: int) -> List[dict]:
+    return [
+        MediaImage(title=f'Imagine {i}', url=f'/api/uploads/{i}.jpg', albumId='album', category='street').model_dump()
+        for i in range(count)
+    ]
+
+
+def before(model, adapter):
+    def run(docs):
+        items = [model(**doc) for doc in docs]
+        content = [item.model_dump(by_alias=True) for item in items]
+        value = adapter.validate_python(content)
+        return json.dumps(adapter.dump_python(value, mode='json'), ensure_ascii=False).encode()
+    return run
+
+
+def after(model):
+    reader = trusted_reader(model)
+    return reader.encode
+
+
+def bench(name: str, model, docs: List[dict], repeats: int):
+    adapter = TypeAdapter(List[model])
+    stored = [{'_id': ObjectId(), **doc} for doc in docs]
+    old = before(model, adapter)
+    new = after(model)
+    assert json.loads(old(stored)) == json.loads(new(docs))
+
+    old_time = min(timeit.repeat(lambda: old(stored), number=1, repeat=repeats))
+    new_time = min(timeit.repeat(lambda: new(docs), number=1, repeat=repeats))
+    per_doc = 1e6 / len(docs)
+    print(f"{name:<12} before {old_time * per_doc:7.2f} us/doc   "
+          f"after {new_time * per_doc:7.2f} us/doc   x{old_time / new_time:.1f}")
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    bench('projects', Project, sample_projects(count), repeats)
+    bench('media', MediaImage, sample_media(count), repeats)
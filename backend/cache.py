@@ -0,0 +1,105 @@
+import hashlib
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from typing import Any, Hashable, Iterable, Optional
+
+
+class ResponseCache:
+    """
+    Bounded in-process cache for public read responses.
+
+    Entries expire after `ttl` seconds and are evicted least-recently-used
+    once `max_entries` is reached. Every entry is tagged with the collections
+    it was built from so write handlers can drop exactly what they touched.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(route: str, **params) -> tuple:
+        return (route, tuple(sorted(params.items())))
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, _, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[str]):
+        self._entries[key] = (time.monotonic() + self.ttl, frozenset(tags), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *tags: str):
+        tags = set(tags)
+        stale = [k for k, (_, entry_tags, _) in self._entries.items() if entry_tags & tags]
+        for k in stale:
+            del self._entries[k]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'maxEntries': self.max_entries,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+class CollectionVersions:
+    """
+    Monotonic per-collection write counters.
+
+    Every write bumps the collections it touched, so a (collections, scope)
+    pair maps to a strong ETag that changes exactly when the underlying data
+    can have changed. The boot id keeps ETags from a previous process from
+    matching after a restart resets the counters.
+    """
+
+    def __init__(self):
+        self._boot = uuid.uuid4().hex[:8]
+        self._versions = defaultdict(int)
+
+    def bump(self, *collections: str):
+        for name in collections:
+            self._versions[name] += 1
+
+    def get(self, name: str) -> int:
+        return self._versions[name]
+
+    def snapshot(self, collections: Iterable[str]) -> tuple:
+        return tuple(self._versions[name] for name in collections)
+
+    def etag(self, collections: Iterable[str], scope: Hashable = '') -> str:
+        versions = '.'.join(str(self._versions[name]) for name in collections)
+        digest = hashlib.blake2s(repr(scope).encode(), digest_size=6).hexdigest()
+        return f'"{self._boot}-{versions}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # If-None-Match uses the weak comparison, so a W/ prefix still matches
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return any(tag == '*' or tag.removeprefix('W/') == etag for tag in candidates)
@@ -0,0 +1,161 @@
+"""
+Background cleanup after cascading deletes.
+
+Deleting an album removes the album and its images in one transaction and
+returns. What is left — their entries in the blob index and the files that
+nothing uses any more — is handed to a cleanup job. Jobs run one at a time
+on a single worker, so deleting a few large albums in a row doesn't start
+a burst of storage deletes, and their progress is kept for the admin
+(GET /api/admin/cleanup).
+
+A file is only removed when its blob record lists no other document, the
+profile doesn't use it and it wasn't uploaded within the garbage collector's
+grace period (UPLOAD_GC_GRACE): a re-upload of the same content is a
+deduplicated hit on this file, and the document it is for may not be saved
+yet. Jobs live in memory; one lost to a restart, like a file kept for its
+grace period, is left to the upload garbage collector.
+"""
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from storage import upload_keys
+from upload_gc import uploads_in, SIBLING_SUFFIXES, UPLOAD_GC_GRACE
+from uploads import drop_references, referenced_uploads
+
+logger = logging.getLogger(__name__)
+
+CLEANUP_BATCH_SIZE = 200
+CLEANUP_HISTORY = 50
+
+
+class FileCleanup:
+    def __init__(self, storage, history: int = CLEANUP_HISTORY, grace: float = UPLOAD_GC_GRACE):
+        self.storage = storage
+        self.history = history
+        self.grace = grace
+        self.jobs: 'OrderedDict[str, dict]' = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def submit(self, db, documents: List[Tuple[str, dict]], **details) -> dict:
+        """
+        Queue the cleanup for deleted `documents`, (collection, document)
+        pairs carrying at least their id and upload fields. `details` are
+        shown with the job's progress.
+        """
+        job = {
+            'id': os.urandom(8).hex(),
+            'state': 'queued',
+            **details,
+            'documents': len(documents),
+            'referencesDropped': 0,
+            'files': 0,
+            'removedFiles': 0,
+            'keptFiles': 0,
+            'queuedAt': datetime.utcnow().isoformat(),
+        }
+        self.jobs[job['id']] = job
+        while len(self.jobs) > self.history:
+            oldest = next(iter(self.jobs.values()))
+            if oldest['state'] in ('queued', 'running'):
+                break
+            self.jobs.popitem(last=False)
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._queue.put_nowait((db, job, documents))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self.work())
+        return job
+
+    def get(self, job_id: str) -> Optional[dict]:
+        return self.jobs.get(job_id)
+
+    def list(self) -> List[dict]:
+        """Jobs, newest first."""
+        return list(reversed(self.jobs.values()))
+
+    async def work(self):
+        while not self._queue.empty():
+            db, job, documents = self._queue.get_nowait()
+            await self.run(db, job, documents)
+
+    async def run(self, db, job: dict, documents: List[Tuple[str, dict]]):
+        started = time.perf_counter()
+        job.update(state='running', startedAt=datetime.utcnow().isoformat())
+        try:
+            names = await self.drop_references(db, job, documents)
+            await self.remove_files(db, job, names)
+            job['state'] = 'done'
+        except Exception as e:
+            logger.error(f"Cleanup job {job['id']} failed: {e}")
+            job.update(state='failed', error=str(e))
+        job['finishedAt'] = datetime.utcnow().isoformat()
+        job['seconds'] = round(time.perf_counter() - started, 3)
+        logger.info(f"Cleanup job {job['id']} {job['state']}: removed {job['removedFiles']} of {job['files']} files")
+
+    async def drop_references(self, db, job: dict, documents: List[Tuple[str, dict]]) -> Set[str]:
+        """Take the documents out of the blob index; return the uploads they used."""
+        names = set()
+        by_collection: Dict[str, List[dict]] = {}
+        for collection, doc in documents:
+            by_collection.setdefault(collection, []).append(doc)
+            names |= referenced_uploads(collection, doc)
+        for collection, docs in by_collection.items():
+            for start in range(0, len(docs), CLEANUP_BATCH_SIZE):
+                batch = docs[start:start + CLEANUP_BATCH_SIZE]
+                await drop_references(db, collection, [doc['id'] for doc in batch])
+                job['referencesDropped'] += len(batch)
+        return names
+
+    async def remove_files(self, db, job: dict, names: Set[str]):
+        # The profile's uploads aren't in the blob index
+        profile = await db.profile.find_one({}, {'_id': 0})
+        names = sorted(names - uploads_in(profile))
+        job['files'] = len(names)
+        cutoff = (datetime.utcnow() - timedelta(seconds=self.grace)).isoformat()
+        unused = {'refs.0': {'$exists': False}, 'uploadedAt': {'$not': {'$gte': cutoff}}}
+        for start in range(0, len(names), CLEANUP_BATCH_SIZE):
+            batch = names[start:start + CLEANUP_BATCH_SIZE]
+            # One at a time, so a file is only deleted with the record that
+            # was still unused when it went
+            blobs = []
+            for name in batch:
+                blob = await db.blobs.find_one_and_delete({'id': name, **unused}, {'_id': 0, 'id': 1, 'variants': 1})
+                if blob:
+                    blobs.append(blob)
+            # Uploaded again since its record was deleted
+            if blobs:
+                again = await db.blobs.find(
+                    {'id': {'$in': [blob['id'] for blob in blobs]}}, {'_id': 0, 'id': 1}).to_list(None)
+                again = {blob['id'] for blob in again}
+                blobs = [blob for blob in blobs if blob['id'] not in again]
+            removed = [blob['id'] for blob in blobs]
+            keys = []
+            shared = await self.shared_stems(db, removed)
+            for blob in blobs:
+                keys.extend(blob['id'] + suffix for suffix in SIBLING_SUFFIXES)
+                stem = blob['id'].rsplit('.', 1)[0]
+                # The same content stored under another suffix (another type, or a
+                # spelling kept from before upload_name() was canonical) shares variants
+                keys.extend(upload_keys(blob['id'], None if stem in shared else blob.get('variants')))
+            if keys:
+                await self.storage.delete(keys)
+            job['removedFiles'] += len(removed)
+            job['keptFiles'] += len(batch) - len(removed)
+
+    @staticmethod
+    async def shared_stems(db, names: List[str]) -> Set[str]:
+        """Stems of `names` that another stored file also has."""
+        if not names:
+            return set()
+        stems = {name.rsplit('.', 1)[0] for name in names}
+        pattern = '^(' + '|'.join(re.escape(stem) for stem in sorted(stems)) + r')\.'
+        others = await db.blobs.find(
+            {'id': {'$regex': pattern, '$nin': names}}, {'_id': 0, 'id': 1}).to_list(None)
+        return {other['id'].rsplit('.', 1)[0] for other in others}
@@ -0,0 +1,63 @@
+"""
+Facet counts (category / technology chips) kept in memory.
+
+Counts are computed once at startup and then adjusted by the write handlers
+from the before/after versions of each document, so /api/facets never scans
+a collection.
+"""
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# collection -> {facet name: document field}
+FACET_FIELDS = {
+    'projects': {'category': 'category', 'technology': 'technologies'},
+    'media': {'category': 'category'},
+}
+
+
+def facet_values(doc: Optional[dict], field: str) -> Iterable[str]:
+    if not doc:
+        return ()
+    value = doc.get(field)
+    values = value if isinstance(value, list) else [value]
+    # A project listing the same technology twice still counts once
+    return {v for v in values if v}
+
+
+class FacetCounts:
+    def __init__(self):
+        self.counts: Dict[str, Dict[str, Counter]] = defaultdict(lambda: defaultdict(Counter))
+
+    def projection(self, collection: str) -> dict:
+        return {'_id': 0, **{field: 1 for field in FACET_FIELDS[collection].values()}}
+
+    def apply(self, collection: str, old: Optional[dict], new: Optional[dict]):
+        """Move the counts of `collection` from document `old` to `new` (either may be None)."""
+        for facet, field in FACET_FIELDS[collection].items():
+            counter = self.counts[collection][facet]
+            counter.subtract(facet_values(old, field))
+            counter.update(facet_values(new, field))
+            for value in [v for v, n in counter.items() if n <= 0]:
+                del counter[value]
+
+    async def rebuild_collection(self, db, collection: str):
+        self.counts.pop(collection, None)
+        async for doc in db[collection].find({}, self.projection(collection)):
+            self.apply(collection, None, doc)
+
+    async def rebuild(self, db):
+        for collection in FACET_FIELDS:
+            await self.rebuild_collection(db, collection)
+        logger.info("Facet counts built")
+
+    def snapshot(self) -> dict:
+        return {
+            collection: {
+                facet: dict(self.counts[collection][facet].most_common())
+                for facet in facets
+            }
+            for collection, facets in FACET_FIELDS.items()
+        }
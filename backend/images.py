@@ -0,0 +1,335 @@
+"""
+Responsive image variants.
+
+Every uploaded image is re-encoded at a few bounded widths in AVIF, WebP and
+a JPEG (PNG for images with transparency) fallback. Decoding and encoding run
+in a process pool, so a large photo never holds the event loop or the GIL.
+
+Variants live next to the uploads, in `variants/<stem>-<width>.<ext>`. The
+`blobs` collection stores each file's variant map and the write handlers copy
+it onto the documents that use the file:
+
+    {"auto": {"320": "/api/images/<stem>/320", ...},
+     "avif": {"320": "/api/uploads/variants/<stem>-320.avif", ...},
+     "webp": {...}, "jpeg": {...}}
+
+"auto" URLs pick the best format the browser's Accept header allows, so
+`srcset` can be built from them without a <picture> element.
+
+The same pass measures the image for layout before it loads: its upright
+width and height, a dominant color and a ~16px WebP placeholder (LQIP) as a
+data URI. Media documents carry these as fields, projects and albums as an
+`imageInfo` map keyed by upload URL.
+
+Run this module directly to generate variants for files uploaded before the
+pipeline existed:
+
+    MONGO_URL=mongodb://localhost:27017 python images.py
+
+With STORAGE_BACKEND=s3 the originals are fetched from, and the variants
+published to, the bucket (see storage.py).
+"""
+import asyncio
+import base64
+import io
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from storage import storage_from_env, upload_keys
+from uploads import REFERENCE_FIELDS, UPLOAD_URL_PREFIX, upload_filename
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (320, 640, 1024, 1600)
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.webp', '.avif', '.bmp', '.tif', '.tiff'}
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', str(min(2, os.cpu_count() or 1))))
+VARIANTS_DIR = 'variants'
+EXIF_ORIENTATION = 0x0112
+
+# format -> (extension, content type, Pillow save options)
+VARIANT_FORMATS = {
+    'avif': ('avif', 'image/avif', {'quality': 55, 'speed': 6}),
+    'webp': ('webp', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'png': ('png', 'image/png', {'optimize': True}),
+}
+
+# Negotiation order for /api/images; the last format present is the fallback
+FORMAT_PREFERENCE = ('avif', 'webp', 'jpeg', 'png')
+
+PLACEHOLDER_SIZE = 16
+PALETTE_SAMPLE = 64
+PALETTE_COLORS = 5
+
+
+class ProcessedImage(NamedTuple):
+    variants: Dict[str, Dict[str, str]]
+    info: Optional[dict]
+
+
+def variant_widths(width: int) -> List[int]:
+    widths = [w for w in VARIANT_WIDTHS if w < width]
+    if width < VARIANT_WIDTHS[-1]:
+        widths.append(width)
+    return widths
+
+
+def describe_image(image, width: int, height: int) -> dict:
+    """Layout metadata for a decoded image: size, dominant color and an inline placeholder."""
+    from PIL import Image
+
+    sample = image.convert('RGB')
+    sample.thumbnail((PALETTE_SAMPLE, PALETTE_SAMPLE), Image.BOX)
+    quantized = sample.quantize(colors=PALETTE_COLORS, method=Image.Quantize.MEDIANCUT)
+    _, index = max(quantized.getcolors())
+    r, g, b = quantized.getpalette()[index * 3:index * 3 + 3]
+
+    placeholder = image.copy()
+    placeholder.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.BOX)
+    buffer = io.BytesIO()
+    placeholder.save(buffer, format='WEBP', quality=40)
+    return {
+        'width': width,
+        'height': height,
+        'color': f'#{r:02x}{g:02x}{b:02x}',
+        'placeholder': 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii'),
+    }
+
+
+def render_variants(source: str, directory: str, stem: str) -> Tuple[Dict[str, Dict[str, str]], dict]:
+    """
+    Write the variants of `source` to `directory`; return ({format: {width: file name}}, info).
+
+    Runs in a worker process.
+    """
+    from PIL import Image, ImageOps, features
+
+    with Image.open(source) as image:
+        animated = getattr(image, 'n_frames', 1) > 1
+        # Orientations 5-8 are stored rotated by 90 degrees
+        rotated = image.getexif().get(EXIF_ORIENTATION, 1) in (5, 6, 7, 8)
+        width, height = (image.height, image.width) if rotated else image.size
+        widths = variant_widths(width)
+        # Let the JPEG decoder downscale by a power of two while decoding
+        scale = widths[-1] / width
+        image.draft('RGB', (round(image.width * scale), round(image.height * scale)))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    info = describe_image(image, width, height)
+    if animated:
+        return {}, info  # animations are served as uploaded
+
+    formats = [f for f in ('avif', 'webp') if features.check(f)] + ['png' if has_alpha else 'jpeg']
+    output = {fmt: {} for fmt in formats}
+    # Largest first, each width resized from the previous one
+    for width in sorted(widths, reverse=True):
+        height = max(1, round(image.height * width / image.width))
+        if width != image.width:
+            image = image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        for fmt in formats:
+            extension, _, options = VARIANT_FORMATS[fmt]
+            name = f'{stem}-{width}.{extension}'
+            tmp = os.path.join(directory, f'.{name}.tmp')
+            image.save(tmp, format=fmt.upper(), **options)
+            os.replace(tmp, os.path.join(directory, name))
+            output[fmt][str(width)] = name
+    return output, info
+
+
+def resize_image(source: str, target: str, width: Optional[int], height: Optional[int], fmt: str) -> int:
+    """
+    Fit `source` inside width x height (either may be None), never upscaling,
+    and save it to `target` as `fmt`. Returns the size of the written file.
+
+    Runs in a worker process.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        rotated = image.getexif().get(EXIF_ORIENTATION, 1) in (5, 6, 7, 8)
+        upright = (image.height, image.width) if rotated else image.size
+        box = (width or upright[0], height or upright[1])
+        scale = min(1.0, box[0] / upright[0], box[1] / upright[1])
+        image.draft('RGB', (round(image.width * scale), round(image.height * scale)))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha and fmt != 'jpeg' else 'RGB')
+    image.thumbnail(box, Image.LANCZOS, reducing_gap=3.0)
+    _, _, options = VARIANT_FORMATS[fmt]
+    tmp = f'{target}.{os.getpid()}.tmp'
+    image.save(tmp, format=fmt.upper(), **options)
+    os.replace(tmp, target)
+    return os.path.getsize(target)
+
+
+def accepted_format(accept: str, filename: str) -> str:
+    """AVIF or WebP when the client accepts them, else the source's own family."""
+    from PIL import features
+
+    for fmt in ('avif', 'webp'):
+        if VARIANT_FORMATS[fmt][1] in accept and features.check(fmt):
+            return fmt
+    return 'png' if Path(filename).suffix.lower() == '.png' else 'jpeg'
+
+
+class ImagePipeline:
+    def __init__(self, upload_dir: Path, workers: int = IMAGE_WORKERS):
+        self.upload_dir = upload_dir
+        self.variants_dir = upload_dir / VARIANTS_DIR
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Not forked from this process: a lock held by one of Motor's
+            # threads at fork time would never be released in the worker
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method))
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    @staticmethod
+    def is_image(filename: str) -> bool:
+        return Path(filename).suffix.lower() in IMAGE_SUFFIXES
+
+    async def generate(self, filename: str) -> Optional[ProcessedImage]:
+        """
+        Variant map and layout info for an uploaded file; empty when it isn't
+        a decodable image. None when it couldn't be tried (the file isn't in
+        the upload directory, or the pool broke): that isn't a result to
+        keep, so the blob is left for backfill().
+        """
+        if not self.is_image(filename):
+            return ProcessedImage({}, None)
+        source = self.upload_dir / filename
+        if not source.is_file():
+            logger.warning(f"Could not generate variants for {filename}: not in the upload directory")
+            return None
+        stem = Path(filename).stem
+        self.variants_dir.mkdir(exist_ok=True)
+        loop = asyncio.get_running_loop()
+        try:
+            files, info = await loop.run_in_executor(
+                self.pool, render_variants, str(source), str(self.variants_dir), stem)
+        except BrokenExecutor as e:
+            logger.warning(f"Could not generate variants for {filename}: {e}")
+            self.shutdown()
+            return None
+        except Exception as e:
+            logger.warning(f"Could not generate variants for {filename}: {e}")
+            return ProcessedImage({}, None)
+        if not files:
+            return ProcessedImage({}, info)
+        variants = {'auto': {width: f'/api/images/{stem}/{width}' for width in next(iter(files.values()))}}
+        for fmt, names in files.items():
+            variants[fmt] = {width: f'/api/uploads/{VARIANTS_DIR}/{name}' for width, name in names.items()}
+        return ProcessedImage(variants, info)
+
+    def negotiate(self, stem: str, width: int, accept: str) -> Optional[tuple]:
+        """(path, content type) of the best existing variant the client accepts."""
+        for fmt in FORMAT_PREFERENCE:
+            extension, content_type, _ = VARIANT_FORMATS[fmt]
+            if fmt in ('avif', 'webp') and content_type not in accept:
+                continue
+            path = self.variants_dir / f'{stem}-{width}.{extension}'
+            if path.is_file():
+                return path, content_type
+        return None
+
+
+def negotiate_variant(variants: Dict[str, dict], width: int, accept: str) -> Optional[tuple]:
+    """(storage key, content type) of the best variant in a variant map the client accepts."""
+    for fmt in FORMAT_PREFERENCE:
+        extension, content_type, _ = VARIANT_FORMATS[fmt]
+        if fmt in ('avif', 'webp') and content_type not in accept:
+            continue
+        url = variants.get(fmt, {}).get(str(width))
+        if url:
+            return url.split(UPLOAD_URL_PREFIX, 1)[1], content_type
+    return None
+
+
+def media_fields(variants: Dict[str, dict], info: Optional[dict]) -> dict:
+    """The image fields of a media document whose `url` has `variants` and `info`."""
+    info = info or {}
+    return {
+        'variants': variants,
+        **{field: info.get(field) for field in ('width', 'height', 'color', 'placeholder')},
+    }
+
+
+async def image_fields(db, collection: str, doc: dict) -> dict:
+    """
+    The fields derived from the uploads `doc` references, read from their
+    blob records: `variants` (and `imageInfo` on projects and albums, or the
+    flat layout fields on media), keyed by upload URL.
+    """
+    urls = []
+    for field in REFERENCE_FIELDS[collection]:
+        value = doc.get(field)
+        urls.extend(value if isinstance(value, list) else [value])
+    names = {url: upload_filename(url) for url in urls if upload_filename(url)}
+    blobs = {}
+    if names:
+        cursor = db.blobs.find(
+            {'id': {'$in': sorted(set(names.values()))}}, {'_id': 0, 'id': 1, 'variants': 1, 'info': 1})
+        blobs = {blob['id']: blob for blob in await cursor.to_list(None)}
+    variants = {url: blobs[name]['variants'] for url, name in names.items() if blobs.get(name, {}).get('variants')}
+    info = {url: blobs[name]['info'] for url, name in names.items() if blobs.get(name, {}).get('info')}
+    if collection == 'media':
+        return media_fields(variants, info.get(doc.get('url')))
+    return {'variants': variants, 'imageInfo': info}
+
+
+async def backfill(db, pipeline: ImagePipeline, storage) -> int:
+    """Process stored images missing variants or info and refresh the documents using them."""
+    generated = 0
+    missing = {'$or': [{'variants': {'$exists': False}}, {'info': {'$exists': False}}]}
+    async for blob in db.blobs.find(missing, {'_id': 0, 'id': 1, 'refs': 1}):
+        if not pipeline.is_image(blob['id']) or not await storage.fetch(blob['id']):
+            continue
+        processed = await pipeline.generate(blob['id'])
+        if processed is None:
+            continue
+        await storage.publish(upload_keys(blob['id'], processed.variants)[1:])
+        await db.blobs.update_one({'id': blob['id']}, {'$set': processed._asdict()})
+        generated += 1
+        for ref in blob.get('refs', []):
+            collection, doc_id = ref.split(':', 1)
+            doc = await db[collection].find_one({'id': doc_id}, {'_id': 0})
+            if doc:
+                await db[collection].update_one({'id': doc_id}, {'$set': await image_fields(db, collection, doc)})
+    return generated
+
+
+async def main():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ.get('DB_NAME', 'lwr_portfolio')]
+    upload_dir = Path(os.environ.get('UPLOAD_DIR', '/app/backend/uploads'))
+    pipeline = ImagePipeline(upload_dir)
+    try:
+        generated = await backfill(db, pipeline, storage_from_env(upload_dir, os.environ.get('JWT_SECRET', '')))
+    finally:
+        pipeline.shutdown()
+        client.close()
+    print(f"Generated variants for {generated} uploads")
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(main()))
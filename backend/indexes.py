@@ -0,0 +1,141 @@
+"""
+Index reconciliation and query-plan checks.
+
+The indexes each collection needs are declared next to its model in
+models.py. `ensure_indexes` creates the missing ones at startup and reports
+indexes that exist in MongoDB but are no longer declared (they are left in
+place so a rollback never loses an index).
+
+Run this module directly to reconcile a database and assert that every
+route query is served by an index:
+
+    MONGO_URL=mongodb://localhost:27017 python indexes.py
+"""
+import asyncio
+import logging
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from models import COLLECTION_INDEXES
+from pagination import encode_cursor, keyset_query, sort_spec
+
+logger = logging.getLogger(__name__)
+
+# A cursor in the middle of a collection, to check the plans of later pages
+SAMPLE_CURSOR_VALUE = '2024-01-01T00:00:00'
+
+
+def route_queries(collection: str, query: dict, sort_field: str) -> List[Tuple[str, dict, List[tuple]]]:
+    """The first-page and later-page shapes fetch_page() issues for `query`."""
+    cursor = encode_cursor({sort_field: SAMPLE_CURSOR_VALUE, 'id': 'id'}, sort_field)
+    return [
+        (collection, keyset_query(query, sort_field, page_cursor), sort_spec(sort_field))
+        for page_cursor in (None, cursor)
+    ]
+
+
+# (collection, filter, sort) shapes issued by the handlers in routes.py
+ROUTE_QUERIES: List[Tuple[str, dict, Optional[List[tuple]]]] = [
+    *route_queries('projects', {}, 'createdAt'),
+    *route_queries('projects', {'featured': True}, 'createdAt'),
+    *route_queries('projects', {'category': 'electronics'}, 'createdAt'),
+    *route_queries('projects', {'technologies': 'Python'}, 'createdAt'),
+    ('albums', {}, sort_spec('createdAt')),
+    *route_queries('media', {}, 'date'),
+    # Also the album detail's $lookup, which matches albumId and then runs
+    # the keyset page and the image count
+    *route_queries('media', {'albumId': 'album'}, 'date'),
+    ('media', {'albumId': 'album'}, None),
+    *route_queries('media', {'category': 'street'}, 'date'),
+    *route_queries('media', {'albumId': 'album', 'category': 'street'}, 'date'),
+    *route_queries('reviews', {}, 'date'),
+    *route_queries('contact', {}, 'date'),
+]
+
+FORBIDDEN_STAGES = {'COLLSCAN', 'SORT'}
+
+
+async def ensure_indexes(db) -> Dict[str, dict]:
+    report = {}
+    for collection_name, specs in COLLECTION_INDEXES.items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+        created, mismatched = [], []
+        for spec in specs:
+            current = existing.get(spec.name)
+            if current is None:
+                await collection.create_index(spec.keys, name=spec.name, unique=spec.unique)
+                created.append(spec.name)
+            elif bool(current.get('unique')) != spec.unique:
+                mismatched.append(spec.name)
+        declared = {spec.name for spec in specs} | {'_id_'}
+        extra = sorted(set(existing) - declared)
+        report[collection_name] = {'created': created, 'extra': extra, 'mismatched': mismatched}
+        if created:
+            logger.info(f"Created indexes on {collection_name}: {', '.join(created)}")
+        if extra:
+            logger.warning(f"Undeclared indexes on {collection_name}: {', '.join(extra)}")
+        if mismatched:
+            logger.warning(f"Indexes with different options on {collection_name}: {', '.join(mismatched)}")
+    return report
+
+
+def plan_stages(plan) -> List[str]:
+    """Every `stage` named anywhere in an explain() plan tree."""
+    stages = []
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+
+async def assert_indexed(collection, query: dict, sort: Optional[List[tuple]] = None):
+    """Fail if the winning plan scans the collection or sorts in memory."""
+    cursor = collection.find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    explanation = await cursor.explain()
+    stages = plan_stages(explanation['queryPlanner']['winningPlan'])
+    bad = FORBIDDEN_STAGES.intersection(stages)
+    if bad:
+        raise AssertionError(
+            f"{collection.name} {query} sorted by {sort} uses {', '.join(sorted(bad))} ({' > '.join(stages)})"
+        )
+
+
+async def check_route_plans(db) -> List[str]:
+    failures = []
+    for collection_name, query, sort in ROUTE_QUERIES:
+        try:
+            await assert_indexed(db[collection_name], query, sort)
+        except AssertionError as e:
+            failures.append(str(e))
+    return failures
+
+
+async def main():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ.get('DB_NAME', 'lwr_portfolio')]
+    try:
+        report = await ensure_indexes(db)
+        for collection_name, result in report.items():
+            print(f"{collection_name}: {result}")
+        failures = await check_route_plans(db)
+    finally:
+        client.close()
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(main()))
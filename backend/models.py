@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic_core import to_json
+from typing import Dict, List, Optional, Tuple, Type
+from functools import lru_cache
 from datetime import datetime
 import uuid
 
@@ -8,6 +10,68 @@ def generate_id():
     return str(uuid.uuid4())
 
 
+class TrustedReader:
+    """
+    Serializer for documents read back from our own collections.
+
+    They were validated when they were written, so reads skip model
+    construction and response_model validation and go straight from the
+    Mongo dict to JSON through pydantic-core. Static defaults fill in fields
+    added to a model after a document was stored.
+    """
+
+    def __init__(self, model: Type[BaseModel], fields: Optional[Tuple[str, ...]] = None):
+        self.fields = fields or tuple(model.model_fields)
+        self.defaults = {
+            name: info.default
+            for name, info in model.model_fields.items()
+            if not info.is_required() and info.default_factory is None
+        }
+        self.projection = {'_id': 0, **{name: 1 for name in self.fields}}
+
+    def row(self, doc: dict) -> dict:
+        defaults = self.defaults
+        return {name: doc[name] if name in doc else defaults.get(name) for name in self.fields}
+
+    def rows(self, docs: List[dict]) -> List[dict]:
+        return [self.row(doc) for doc in docs]
+
+    def encode_one(self, doc: dict) -> bytes:
+        return to_json(self.row(doc))
+
+    def encode(self, docs: List[dict]) -> bytes:
+        return to_json(self.rows(docs))
+
+
+@lru_cache(maxsize=128)
+def trusted_reader(model: Type[BaseModel], fields: Optional[Tuple[str, ...]] = None) -> TrustedReader:
+    return TrustedReader(model, fields)
+
+
+# Index declarations, reconciled at startup by indexes.ensure_indexes
+class IndexSpec(BaseModel):
+    keys: List[Tuple[str, int]]
+    unique: bool = False
+
+    @property
+    def name(self) -> str:
+        # Same naming scheme MongoDB uses for unnamed indexes
+        return '_'.join(f'{field}_{direction}' for field, direction in self.keys)
+
+
+# Responsive variants of an uploaded image: format ("auto", "avif", "webp",
+# "jpeg" or "png") -> width -> URL. See images.py.
+ImageVariants = Dict[str, Dict[str, str]]
+
+
+# What a page needs to lay out an image before it loads
+class ImageInfo(BaseModel):
+    width: int
+    height: int
+    color: str  # dominant color, "#rrggbb"
+    placeholder: str  # tiny blurred WebP as a data URI
+
+
 # Auth Models
 class AdminLogin(BaseModel):
     password: str
@@ -39,6 +103,18 @@ class Project(ProjectBase):
     id: str = Field(default_factory=generate_id)
     date: str = Field(default_factory=lambda: datetime.utcnow().strftime('%Y-%m-%d'))
     createdAt: str = Field(default_factory=lambda: datetime.utcnow().isoformat())
+    # Upload URL (image or gallery entry) -> its variants / layout info
+    variants: Dict[str, ImageVariants] = {}
+    imageInfo: Dict[str, ImageInfo] = {}
+
+
+PROJECT_INDEXES = [
+    IndexSpec(keys=[('id', 1)], unique=True),
+    IndexSpec(keys=[('createdAt', -1), ('id', -1)]),
+    IndexSpec(keys=[('featured', 1), ('createdAt', -1), ('id', -1)]),
+    IndexSpec(keys=[('category', 1), ('createdAt', -1), ('id', -1)]),
+    IndexSpec(keys=[('technologies', 1), ('createdAt', -1), ('id', -1)]),
+]
 
 
 # Album Models
@@ -55,6 +131,24 @@ class AlbumCreate(AlbumBase):
 class Album(AlbumBase):
     id: str = Field(default_factory=generate_id)
     createdAt: str = Field(default_factory=lambda: datetime.utcnow().strftime('%Y-%m-%d'))
+    variants: Dict[str, ImageVariants] = {}
+    imageInfo: Dict[str, ImageInfo] = {}
+
+
+class AlbumSummary(Album):
+    imageCount: Optional[int] = None
+    latestImageDate: Optional[str] = None
+
+
+class AlbumDetail(Album):
+    imageCount: int = 0
+    images: List["MediaImage"] = []
+
+
+ALBUM_INDEXES = [
+    IndexSpec(keys=[('id', 1)], unique=True),
+    IndexSpec(keys=[('createdAt', -1), ('id', -1)]),
+]
 
 
 # Media Image Models
@@ -72,6 +166,43 @@ class MediaImageCreate(MediaImageBase):
 class MediaImage(MediaImageBase):
     id: str = Field(default_factory=generate_id)
     date: str = Field(default_factory=lambda: datetime.utcnow().strftime('%Y-%m-%d'))
+    variants: Dict[str, ImageVariants] = {}
+    # Layout info of `url` (see ImageInfo)
+    width: Optional[int] = None
+    height: Optional[int] = None
+    color: Optional[str] = None
+    placeholder: Optional[str] = None
+
+
+class MediaImageMetadata(BaseModel):
+    title: Optional[str] = None
+    category: Optional[str] = ""
+
+
+class BulkMediaItem(BaseModel):
+    index: int
+    filename: str
+    success: bool
+    error: Optional[str] = None
+    image: Optional[MediaImage] = None
+
+
+class BulkMediaResult(BaseModel):
+    created: int
+    failed: int
+    items: List[BulkMediaItem]
+
+
+MEDIA_INDEXES = [
+    IndexSpec(keys=[('id', 1)], unique=True),
+    IndexSpec(keys=[('date', -1), ('id', -1)]),
+    IndexSpec(keys=[('albumId', 1), ('date', -1), ('id', -1)]),
+    IndexSpec(keys=[('category', 1), ('date', -1), ('id', -1)]),
+    IndexSpec(keys=[('albumId', 1), ('category', 1), ('date', -1), ('id', -1)]),
+]
+
+
+AlbumDetail.model_rebuild()
 
 
 # Review Models
@@ -91,6 +222,12 @@ class Review(ReviewBase):
     date: str = Field(default_factory=lambda: datetime.utcnow().strftime('%Y-%m-%d'))
 
 
+REVIEW_INDEXES = [
+    IndexSpec(keys=[('id', 1)], unique=True),
+    IndexSpec(keys=[('date', -1), ('id', -1)]),
+]
+
+
 # Contact Models
 class ContactMessageBase(BaseModel):
     name: str
@@ -109,6 +246,12 @@ class ContactMessage(ContactMessageBase):
     date: str = Field(default_factory=lambda: datetime.utcnow().isoformat())
 
 
+CONTACT_INDEXES = [
+    IndexSpec(keys=[('id', 1)], unique=True),
+    IndexSpec(keys=[('date', -1), ('id', -1)]),
+]
+
+
 # Profile Models
 class Profile(BaseModel):
     name: str = "Vacaru Andrei Laurentiu"
@@ -122,3 +265,90 @@ class Profile(BaseModel):
     instagram: str = "#"
     linkedin: str = "#"
     github: str = "#"
+
+
+# Upload Models
+class Blob(BaseModel):
+    id: str
+    sha256: Optional[str] = None
+    size: Optional[int] = None
+    refs: List[str] = []
+    variants: Optional[ImageVariants] = None
+    info: Optional[ImageInfo] = None
+    createdAt: str = Field(default_factory=lambda: datetime.utcnow().isoformat())
+
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int = Field(gt=0)
+
+
+class UploadSession(UploadSessionCreate):
+    id: str
+    offset: int
+    createdAt: str
+    expiresAt: str
+
+
+class PresignedUploadCreate(BaseModel):
+    filename: str
+    contentType: str = 'application/octet-stream'
+    size: int = Field(gt=0)
+    sha256: str = Field(pattern=r'^[0-9a-f]{64}$')
+
+
+class PresignedUploadComplete(BaseModel):
+    key: str
+
+
+# Admin import (see transfer.py)
+class ImportFailure(BaseModel):
+    record: int  # NDJSON line or JSON array position, from 1
+    error: str
+
+
+class ImportResult(BaseModel):
+    collection: str
+    ordered: bool
+    received: int = 0
+    inserted: int = 0
+    updated: int = 0
+    failed: int = 0
+    stopped: bool = False  # an ordered import ends at its first failure
+    errors: List[ImportFailure] = []
+
+
+BLOB_INDEXES = [
+    IndexSpec(keys=[('id', 1)], unique=True),
+    IndexSpec(keys=[('refs', 1)]),
+]
+
+
+# Search Models
+class SearchHit(BaseModel):
+    type: str
+    id: str
+    title: str
+    image: str = ""
+    albumId: Optional[str] = None
+    score: float
+
+
+# Home Models
+class HomeData(BaseModel):
+    profile: Profile
+    featuredProjects: List[Project]
+    latestReviews: List[Review]
+    latestAlbums: List[Album]
+    projectCount: int = 0
+    reviewCount: int = 0
+
+
+COLLECTION_INDEXES = {
+    'projects': PROJECT_INDEXES,
+    'albums': ALBUM_INDEXES,
+    'media': MEDIA_INDEXES,
+    'reviews': REVIEW_INDEXES,
+    'contact': CONTACT_INDEXES,
+    'blobs': BLOB_INDEXES,
+}
@@ -0,0 +1,72 @@
+import base64
+import binascii
+import json
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(doc: dict, sort_field: str) -> str:
+    raw = json.dumps([doc.get(sort_field), doc['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Only plain strings may reach the query, never operator documents
+    if not isinstance(value, str) or not isinstance(last_id, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, last_id
+
+
+def sort_spec(sort_field: str) -> List[tuple]:
+    # `id` breaks ties between documents written in the same second/day
+    return [(sort_field, -1), ('id', -1)]
+
+
+def keyset_query(query: dict, sort_field: str, cursor: Optional[str]) -> dict:
+    """Restrict `query` to the documents strictly after `cursor` in sort order."""
+    if not cursor:
+        return query
+    value, last_id = decode_cursor(cursor)
+    after = [
+        # Implied by the $or, but gives the planner tight bounds on the sort
+        # field's index instead of scanning it from the top
+        {sort_field: {'$lte': value}},
+        {'$or': [
+            {sort_field: {'$lt': value}},
+            {sort_field: value, 'id': {'$lt': last_id}},
+        ]},
+    ]
+    return {'$and': [query, *after] if query else after}
+
+
+def find_sorted(collection, query: dict, sort_field: str, cursor: Optional[str] = None,
+                projection: Optional[dict] = None):
+    """Unbounded Motor cursor over `query` in pagination order, starting after `cursor`."""
+    return collection.find(keyset_query(query, sort_field, cursor), projection).sort(sort_spec(sort_field))
+
+
+async def fetch_page(collection, query: dict, sort_field: str, limit: int,
+                     cursor: Optional[str] = None,
+                     projection: Optional[dict] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    Return up to `limit` documents in (sort_field, id) descending order and
+    the cursor of the next page, or None when this is the last one.
+    """
+    if projection is not None:
+        # The cursor is built from the sort key, so it has to survive the projection
+        projection = {**projection, sort_field: 1, 'id': 1}
+    docs = await find_sorted(collection, query, sort_field, cursor, projection) \
+        .limit(limit + 1).to_list(limit + 1)
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1], sort_field)
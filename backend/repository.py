@@ -0,0 +1,124 @@
+"""
+Single-round-trip access to the content collections.
+
+A Repository wraps one collection of documents keyed by `id`. Reads exclude
+`_id` in the projection, and writes that need the document (to return it or
+to report a missing one) use find_one_and_update / find_one_and_delete, so
+the existence check and the change are one atomic database call. A missing
+document becomes the same 404 for every route.
+
+Writes spanning several collections run through in_transaction().
+"""
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Type, TypeVar
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class Repository:
+    def __init__(self, collection: str, model: Type[BaseModel], label: str,
+                 scope: Optional[Tuple[str, str]] = None):
+        """
+        `label` names the document in errors ("Project not found"). `scope`
+        is the snapshots.refresh() keyword and the document field that limit
+        which snapshots a write touches, e.g. ('album_ids', 'albumId').
+        """
+        self.collection = collection
+        self.model = model
+        self.label = label
+        self.scope = scope
+        self.db = None
+
+    def bind(self, db):
+        self.db = db
+
+    @property
+    def documents(self):
+        return self.db[self.collection]
+
+    def not_found(self) -> HTTPException:
+        return HTTPException(status_code=404, detail=f"{self.label} not found")
+
+    @staticmethod
+    def projection(fields: Optional[dict] = None) -> dict:
+        return {**(fields or {}), '_id': 0}
+
+    def refresh_scope(self, doc: Optional[dict]) -> dict:
+        """snapshots.refresh() keywords for a write to `doc`."""
+        if not self.scope or not doc or doc.get(self.scope[1]) is None:
+            return {}
+        keyword, field = self.scope
+        return {keyword: [doc[field]]}
+
+    async def get(self, doc_id: str, projection: Optional[dict] = None) -> dict:
+        doc = await self.documents.find_one({'id': doc_id}, self.projection(projection))
+        if not doc:
+            raise self.not_found()
+        return doc
+
+    async def insert(self, doc: dict):
+        # insert_one adds _id to the dict it is given
+        await self.documents.insert_one(dict(doc))
+
+    async def update(self, doc_id: str, changes: dict, previous: bool = False) -> Tuple[Optional[dict], dict]:
+        """
+        $set `changes` and return (before, after). The document before the
+        update is only read when `previous` is set; the one after it is then
+        the old document with `changes` applied, which is what the same call
+        with ReturnDocument.AFTER would have returned.
+        """
+        returned = await self.documents.find_one_and_update(
+            {'id': doc_id},
+            {'$set': changes},
+            projection=self.projection(),
+            return_document=ReturnDocument.BEFORE if previous else ReturnDocument.AFTER,
+        )
+        if not returned:
+            raise self.not_found()
+        if previous:
+            return returned, {**returned, **changes}
+        return None, returned
+
+    async def delete(self, doc_id: str, projection: Optional[dict] = None, session=None) -> dict:
+        """Delete the document and return the `projection` fields of it (at least `id`)."""
+        doc = await self.documents.find_one_and_delete(
+            {'id': doc_id}, self.projection({'id': 1, **(projection or {})}), session=session)
+        if not doc:
+            raise self.not_found()
+        return doc
+
+
+_transaction_support: Dict[int, bool] = {}
+
+
+async def supports_transactions(db) -> bool:
+    """Whether the server is a replica set member or mongos; a standalone mongod has no transactions."""
+    key = id(db.client)
+    if key not in _transaction_support:
+        try:
+            hello = await db.command('hello')
+            supported = 'setName' in hello or hello.get('msg') == 'isdbgrid'
+        except Exception:
+            supported = False
+        if not supported:
+            logger.warning("MongoDB is not a replica set; multi-collection writes run without a transaction")
+        _transaction_support[key] = supported
+    return _transaction_support[key]
+
+
+async def in_transaction(db, callback: Callable[..., Awaitable[T]]) -> T:
+    """
+    Run `callback(session)` in a transaction, retried on transient errors,
+    and return its result. Without transaction support it runs once with
+    session None, so the callback should do its most important write first.
+    """
+    if not await supports_transactions(db):
+        return await callback(None)
+    async with await db.client.start_session() as session:
+        return await session.with_transaction(callback)
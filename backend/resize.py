@@ -0,0 +1,130 @@
+"""
+On-demand resizing for /api/uploads/{file}?w=&h=&fmt=.
+
+Resized copies are written to RESIZE_CACHE_DIR on first request and served
+from there afterwards. The directory is capped at RESIZE_CACHE_BYTES and
+evicts least recently used files; recency survives restarts through each
+file's mtime. A file handed out by get() is pinned until release(), so it
+isn't evicted while a response is still reading it. Concurrent requests for the same copy share one resize, and
+only whitelisted sizes are accepted so the endpoint can't be driven into
+resizing to arbitrary dimensions.
+"""
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+RESIZE_SIZES = (160, 320, 480, 640, 800, 1024, 1280, 1600, 1920)
+RESIZE_FORMATS = ('auto', 'avif', 'webp', 'jpeg', 'png')
+RESIZE_CACHE_BYTES = int(os.environ.get('RESIZE_CACHE_BYTES', str(512 * 1024 * 1024)))
+
+
+class ResizeCache:
+    def __init__(self, directory: Path, max_bytes: int = RESIZE_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.entries: 'OrderedDict[str, int]' = OrderedDict()  # name -> size, oldest first
+        self.total_bytes = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._pins: Dict[str, int] = {}
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def load(self):
+        """Pick up the files left by a previous run, least recently used first."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name, stat.st_size))
+        self.entries = OrderedDict((name, size) for _, name, size in sorted(files))
+        self.total_bytes = sum(self.entries.values())
+        self._loaded = True
+        self.evict()
+
+    def touch(self, name: str):
+        self.entries.move_to_end(name)
+        try:
+            os.utime(self.directory / name)
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        for name in list(self.entries):
+            if self.total_bytes <= self.max_bytes or len(self.entries) <= 1:
+                break
+            if self._pins.get(name):
+                continue
+            self.total_bytes -= self.entries.pop(name)
+            self.evictions += 1
+            (self.directory / name).unlink(missing_ok=True)
+
+    def release(self, name: str):
+        """Unpin a file returned by get(); it may be evicted from now on."""
+        pins = self._pins.get(name, 0) - 1
+        if pins > 0:
+            self._pins[name] = pins
+        else:
+            self._pins.pop(name, None)
+            self.evict()
+
+    async def get(self, name: str, render: Callable[[Path], Awaitable[int]]) -> Path:
+        """
+        The cached file `name`, created with `render(path)` (which returns the
+        written size) on a miss. Callers asking for a file that is already
+        being rendered wait for that render instead of starting another.
+        The file is pinned; the caller has to release() it once served.
+        """
+        self._pins[name] = self._pins.get(name, 0) + 1
+        try:
+            return await self._get(name, render)
+        except BaseException:
+            self.release(name)
+            raise
+
+    async def _get(self, name: str, render: Callable[[Path], Awaitable[int]]) -> Path:
+        if not self._loaded:
+            await asyncio.to_thread(self.load)
+        path = self.directory / name
+        if name in self.entries:
+            if path.is_file():
+                self.hits += 1
+                self.touch(name)
+                return path
+            self.total_bytes -= self.entries.pop(name)
+        pending = self._inflight.get(name)
+        if pending is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            pending = asyncio.ensure_future(self._create(name, path, render))
+            self._inflight[name] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(name, None))
+        # A client disconnecting must not cancel the resize other requests wait on
+        return await asyncio.shield(pending)
+
+    async def _create(self, name: str, path: Path, render: Callable[[Path], Awaitable[int]]) -> Path:
+        size = await render(path)
+        self.entries[name] = size
+        self.total_bytes += size
+        self.evict()
+        return path
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self.entries),
+            'bytes': self.total_bytes,
+            'maxBytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+        }
@@ -1,23 +1,61 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, BackgroundTasks, Request, Response, Query, Header, Form
+from starlette.requests import ClientDisconnect
+from starlette.background import BackgroundTask
+from pydantic import TypeAdapter, ValidationError
+from pymongo.errors import BulkWriteError
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import jwt
+import logging
 import os
+import re
+import time
+import asyncio
 from datetime import datetime, timedelta
-import uuid
-import shutil
 from pathlib import Path
+from pydantic_core import to_json
 
 from models import (
     AdminLogin, TokenResponse,
     Project, ProjectCreate,
-    Album, AlbumCreate,
-    MediaImage, MediaImageCreate,
+    Album, AlbumCreate, AlbumSummary, AlbumDetail,
+    MediaImage, MediaImageCreate, MediaImageMetadata, BulkMediaItem, BulkMediaResult,
     Review, ReviewCreate,
     ContactMessage, ContactMessageCreate,
-    Profile
+    Profile,
+    HomeData,
+    SearchHit,
+    Blob, UploadSession, UploadSessionCreate, PresignedUploadCreate, PresignedUploadComplete,
+    ImportResult, ImportFailure,
+    trusted_reader
 )
 from email_service import send_contact_notification
+from cache import ResponseCache, CollectionVersions, etag_matches
+from pagination import fetch_page, find_sorted, keyset_query, encode_cursor, sort_spec, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from streaming import stream_format, stream_documents, NDJSON
+from snapshots import SnapshotPublisher, build_home
+from search import SearchIndex, SEARCH_FIELDS
+from facets import FacetCounts, FACET_FIELDS
+from uploads import (
+    store_upload, upload_metrics, UploadTooLarge, MAX_UPLOAD_BYTES, StoredUpload, UPLOAD_KEY,
+    receive_stream, hash_file, place_upload, upload_name, write_compressed_sibling,
+    UploadSessions, UploadOffsetMismatch, UploadIncomplete,
+    register_blob, update_references, add_references, drop_references, reference_projection, REFERENCE_FIELDS
+)
+from images import (
+    ImagePipeline, image_fields, media_fields, resize_image, accepted_format, negotiate_variant, VARIANT_FORMATS
+)
+from resize import ResizeCache, RESIZE_SIZES, RESIZE_FORMATS
+from static_files import UploadFiles
+from upload_gc import UploadCollector
+from storage import storage_from_env, upload_keys
+from repository import Repository, in_transaction
+from cleanup import FileCleanup
+from transfer import (
+    ndjson_records, json_records, batched, validate_batch, upserts, ImportLineTooLong, REPORT_ERRORS
+)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 security = HTTPBearer(auto_error=False)
@@ -30,15 +68,120 @@ if not SECRET_KEY:
     raise ValueError("JWT_SECRET environment variable is required")
 if not ADMIN_PASSWORD:
     raise ValueError("ADMIN_PASSWORD environment variable is required")
-UPLOAD_DIR = Path('/app/backend/uploads')
+UPLOAD_DIR = Path(os.environ.get('UPLOAD_DIR', '/app/backend/uploads'))
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+# Where uploads are kept for good: UPLOAD_DIR itself, or an S3-compatible bucket
+# (STORAGE_BACKEND=s3) with UPLOAD_DIR as this instance's working copy
+storage = storage_from_env(UPLOAD_DIR, SECRET_KEY)
+
+# Thumbnail/WebP/AVIF variants of uploaded images, encoded in a process pool
+image_pipeline = ImagePipeline(UPLOAD_DIR)
+
+# Files processed at once by POST /api/media/bulk
+BULK_UPLOAD_CONCURRENCY = int(os.environ.get('BULK_UPLOAD_CONCURRENCY', '4'))
+MAX_BULK_FILES = 200
+
+# Mark-and-sweep of files no document references any more
+upload_collector = UploadCollector(storage)
+
+# Blob references and files left behind by cascading deletes, removed in the background
+file_cleanup = FileCleanup(storage)
+
+# Resumable uploads in progress, kept under UPLOAD_DIR/.sessions
+upload_sessions = UploadSessions(UPLOAD_DIR)
+
+# Everything under /api/uploads is served through this (immutable caching, ETags,
+# Range, or a redirect to remote storage); server.py mounts the same instance for
+# nested paths
+upload_files = UploadFiles(directory=str(UPLOAD_DIR), precompressed=True, storage=storage)
+
+# Copies made by /api/uploads/{file}?w=&h=&fmt=, LRU-evicted past RESIZE_CACHE_BYTES
+RESIZE_CACHE_DIR = Path(os.environ.get('RESIZE_CACHE_DIR', '/app/backend/resize_cache'))
+resize_cache = ResizeCache(RESIZE_CACHE_DIR)
+
+# Public GET responses are served from memory until a write invalidates them
+response_cache = ResponseCache(
+    max_entries=int(os.environ.get('RESPONSE_CACHE_SIZE', '256')),
+    ttl=float(os.environ.get('RESPONSE_CACHE_TTL', '300')),
+)
+collection_versions = CollectionVersions()
+
+# Precompressed JSON copies of the public responses, served at /api/snapshots
+SNAPSHOT_DIR = Path(os.environ.get('SNAPSHOT_DIR', '/app/backend/snapshots'))
+SNAPSHOT_DIR.mkdir(exist_ok=True)
+snapshots = SnapshotPublisher(SNAPSHOT_DIR)
+
+# Inverted index over projects, media and reviews, built at startup
+search_index = SearchIndex()
+
+# Category/technology counts, adjusted by every write
+facet_counts = FacetCounts()
+
+# Content collections; writes go through the routes made by crud_routes()
+projects = Repository('projects', Project, 'Project', scope=('project_ids', 'id'))
+albums = Repository('albums', Album, 'Album', scope=('album_ids', 'id'))
+media = Repository('media', MediaImage, 'Image', scope=('album_ids', 'albumId'))
+reviews = Repository('reviews', Review, 'Review')
+contact = Repository('contact', ContactMessage, 'Message')
+REPOSITORIES = [projects, albums, media, reviews, contact]
+
 # In-memory database reference (will be set from server.py)
 db = None
 
 def set_db(database):
     global db
     db = database
+    snapshots.bind(database)
+    for repository in REPOSITORIES:
+        repository.bind(database)
+
+
+def invalidate(*collections):
+    collection_versions.bump(*collections)
+    response_cache.invalidate(*collections)
+
+
+def cache_response(key, value, tags: List[str], versions: tuple):
+    """
+    Cache `value`, read while `tags` were at `versions`, unless a write to
+    one of them landed during the read; the entry would outlive the
+    invalidation and be served under the new ETag.
+    """
+    if collection_versions.snapshot(tags) == versions:
+        response_cache.set(key, value, tags=tags)
+
+
+def not_modified(request: Request, response: Response, key, *collections) -> Optional[Response]:
+    """Answer a conditional GET from the collection versions alone."""
+    etag = collection_versions.etag(collections, scope=key)
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'no-cache'
+    return None
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+
+
+# Sparse fieldsets (?fields=title,image)
+def parse_fields(model, fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    if not fields:
+        return None
+    requested = {name.strip() for name in fields.split(',') if name.strip()}
+    unknown = requested - set(model.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(sorted(requested | {'id'}))
+
+
+def json_response(response: Response, body: bytes) -> Response:
+    # Keep the ETag/cursor headers set on the injected response
+    headers = {k: v for k, v in response.headers.items() if k != 'content-length'}
+    return Response(content=body, media_type='application/json', headers=headers)
 
 
 # JWT Helper
@@ -75,154 +218,452 @@ async def verify_admin(payload: dict = Depends(verify_token)):
     return {'valid': True, 'admin': payload.get('admin', False)}
 
 
+@router.get('/admin/cache')
+async def get_cache_stats(_: dict = Depends(verify_token)):
+    return response_cache.stats()
+
+
+# ==================== CRUD ====================
+
+async def derived_fields(collection: str, data: dict) -> dict:
+    """Fields computed from a document's content rather than sent by the client."""
+    if collection in REFERENCE_FIELDS:
+        return await image_fields(db, collection, data)
+    return {}
+
+
+def write_projection(repository: Repository) -> dict:
+    """What record_write() needs of a deleted document."""
+    collection = repository.collection
+    projection = {}
+    if collection in FACET_FIELDS:
+        projection.update(facet_counts.projection(collection))
+    if collection in REFERENCE_FIELDS:
+        projection.update(reference_projection(collection))
+    if repository.scope:
+        projection[repository.scope[1]] = 1
+    return projection
+
+
+async def record_write(repository: Repository, doc_id: str, old: Optional[dict], new: Optional[dict],
+                       background_tasks: BackgroundTasks):
+    """Bring caches, the search index, facet counts, upload references and snapshots in line with a write."""
+    collection = repository.collection
+    invalidate(collection)
+    if collection in SEARCH_FIELDS:
+        if new:
+            search_index.add(collection, new)
+        else:
+            search_index.remove(collection, doc_id)
+    if collection in FACET_FIELDS:
+        facet_counts.apply(collection, old, new)
+    if collection in REFERENCE_FIELDS:
+        await update_references(db, collection, doc_id, old, new)
+    background_tasks.add_task(snapshots.refresh, collection, **repository.refresh_scope(new or old))
+
+
+def crud_routes(repository: Repository, create_model, path: str,
+                create: bool = True, update: bool = True, delete: bool = True):
+    """
+    Admin POST {path}, PUT {path}/{id} and DELETE {path}/{id} for a
+    repository, each one database round trip plus the bookkeeping in
+    record_write().
+    """
+    model = repository.model
+    collection = repository.collection
+    # Facets and upload references are updated from the document before the write
+    previous = collection in FACET_FIELDS or collection in REFERENCE_FIELDS
+
+    async def create_document(data: create_model, background_tasks: BackgroundTasks,
+                              _: dict = Depends(verify_token)):
+        doc = model(**data.dict(), **await derived_fields(collection, data.dict()))
+        created = doc.model_dump()
+        await repository.insert(created)
+        await record_write(repository, doc.id, None, created, background_tasks)
+        return doc
+
+    async def update_document(doc_id: str, data: create_model, background_tasks: BackgroundTasks,
+                              _: dict = Depends(verify_token)):
+        changes = {**data.dict(), **await derived_fields(collection, data.dict())}
+        old, updated = await repository.update(doc_id, changes, previous=previous)
+        await record_write(repository, doc_id, old, updated, background_tasks)
+        return model(**updated)
+
+    async def delete_document(doc_id: str, background_tasks: BackgroundTasks, _: dict = Depends(verify_token)):
+        old = await repository.delete(doc_id, write_projection(repository))
+        await record_write(repository, doc_id, old, None, background_tasks)
+        return {'success': True}
+
+    if create:
+        router.add_api_route(path, create_document, methods=['POST'], response_model=model,
+                             name=f'create_{collection}')
+    if update:
+        router.add_api_route(path + '/{doc_id}', update_document, methods=['PUT'], response_model=model,
+                             name=f'update_{collection}')
+    if delete:
+        router.add_api_route(path + '/{doc_id}', delete_document, methods=['DELETE'],
+                             name=f'delete_{collection}')
+
+
 # ==================== PROJECTS ====================
 
 @router.get('/projects', response_model=List[Project])
-async def get_projects():
-    projects = await db.projects.find().sort('createdAt', -1).to_list(1000)
-    return [Project(**p) for p in projects]
+async def get_projects(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    stream: bool = False,
+    category: Optional[str] = None,
+    technology: Optional[str] = None,
+):
+    selected = parse_fields(Project, fields)
+    fmt = stream_format(request, stream)
+    key = response_cache.key('projects', limit=limit, cursor=cursor, fields=selected, stream=fmt,
+                             category=category, technology=technology)
+    unchanged = not_modified(request, response, key, 'projects')
+    if unchanged:
+        return unchanged
+    query = {}
+    if category:
+        query['category'] = category
+    if technology:
+        query['technologies'] = technology
+    reader = trusted_reader(Project, selected)
+    if fmt:
+        documents = find_sorted(db.projects, query, 'createdAt', cursor, reader.projection)
+        return stream_documents(fmt, documents, reader.encode_one, response.headers)
+    cached = response_cache.get(key)
+    if cached is None:
+        versions = collection_versions.snapshot(['projects'])
+        projects, next_cursor = await fetch_page(
+            db.projects, query, 'createdAt', limit, cursor, reader.projection)
+        cached = (reader.encode(projects), next_cursor)
+        cache_response(key, cached, ['projects'], versions)
+    body, next_cursor = cached
+    set_next_cursor(response, next_cursor)
+    return json_response(response, body)
 
 
 @router.get('/projects/{project_id}', response_model=Project)
-async def get_project(project_id: str):
-    project = await db.projects.find_one({'id': project_id})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    return Project(**project)
-
-
-@router.post('/projects', response_model=Project)
-async def create_project(data: ProjectCreate, _: dict = Depends(verify_token)):
-    project = Project(**data.dict())
-    await db.projects.insert_one(project.dict())
-    return project
-
-
-@router.put('/projects/{project_id}', response_model=Project)
-async def update_project(project_id: str, data: ProjectCreate, _: dict = Depends(verify_token)):
-    existing = await db.projects.find_one({'id': project_id})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    updated = {**existing, **data.dict()}
-    await db.projects.update_one({'id': project_id}, {'$set': data.dict()})
-    return Project(**updated)
+async def get_project(request: Request, response: Response, project_id: str):
+    unchanged = not_modified(request, response, ('project', project_id), 'projects')
+    if unchanged:
+        return unchanged
+    reader = trusted_reader(Project)
+    project = await projects.get(project_id, reader.projection)
+    return json_response(response, reader.encode_one(project))
 
 
-@router.delete('/projects/{project_id}')
-async def delete_project(project_id: str, _: dict = Depends(verify_token)):
-    result = await db.projects.delete_one({'id': project_id})
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Project not found")
-    return {'success': True}
+crud_routes(projects, ProjectCreate, '/projects')
 
 
 # ==================== ALBUMS ====================
 
-@router.get('/albums', response_model=List[Album])
-async def get_albums():
-    albums = await db.albums.find().sort('createdAt', -1).to_list(1000)
-    return [Album(**a) for a in albums]
-
-
-@router.post('/albums', response_model=Album)
-async def create_album(data: AlbumCreate, _: dict = Depends(verify_token)):
-    album = Album(**data.dict())
-    await db.albums.insert_one(album.dict())
-    return album
-
-
-@router.put('/albums/{album_id}', response_model=Album)
-async def update_album(album_id: str, data: AlbumCreate, _: dict = Depends(verify_token)):
-    existing = await db.albums.find_one({'id': album_id})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Album not found")
-    
-    updated = {**existing, **data.dict()}
-    await db.albums.update_one({'id': album_id}, {'$set': data.dict()})
-    return Album(**updated)
+async def album_stats() -> dict:
+    """Image count and latest image date per album, from one $group over media."""
+    stats = await db.media.aggregate([
+        {'$group': {'_id': '$albumId', 'imageCount': {'$sum': 1}, 'latestImageDate': {'$max': '$date'}}},
+    ]).to_list(None)
+    return {s['_id']: s for s in stats}
+
+
+@router.get('/albums', response_model=List[AlbumSummary])
+async def get_albums(
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
+    withCounts: bool = False,
+):
+    selected = parse_fields(Album, fields)
+    key = response_cache.key('albums', fields=selected, withCounts=withCounts)
+    sources = ['albums', 'media'] if withCounts else ['albums']
+    unchanged = not_modified(request, response, key, *sources)
+    if unchanged:
+        return unchanged
+    body = response_cache.get(key)
+    if body is None:
+        versions = collection_versions.snapshot(sources)
+        reader = trusted_reader(Album, selected)
+        albums = db.albums.find({}, reader.projection).sort(sort_spec('createdAt')).to_list(1000)
+        if withCounts:
+            albums, stats = await asyncio.gather(albums, album_stats())
+            rows = reader.rows(albums)
+            for row in rows:
+                counts = stats.get(row['id'], {})
+                row['imageCount'] = counts.get('imageCount', 0)
+                row['latestImageDate'] = counts.get('latestImageDate')
+            body = to_json(rows)
+        else:
+            body = reader.encode(await albums)
+        cache_response(key, body, sources, versions)
+    return json_response(response, body)
+
+
+@router.get('/albums/{album_id}', response_model=AlbumDetail)
+async def get_album(
+    request: Request,
+    response: Response,
+    album_id: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
+    key = response_cache.key('album', id=album_id, limit=limit, cursor=cursor)
+    unchanged = not_modified(request, response, key, 'albums', 'media')
+    if unchanged:
+        return unchanged
+    cached = response_cache.get(key)
+    if cached is None:
+        versions = collection_versions.snapshot(['albums', 'media'])
+        album_reader = trusted_reader(Album)
+        image_reader = trusted_reader(MediaImage)
+        # Album, one page of its images and the image count in a single round trip
+        pipeline = [
+            {'$match': {'id': album_id}},
+            {'$project': album_reader.projection},
+            {'$lookup': {
+                'from': 'media',
+                'localField': 'id',
+                'foreignField': 'albumId',
+                'pipeline': [
+                    {'$match': keyset_query({}, 'date', cursor)},
+                    {'$sort': dict(sort_spec('date'))},
+                    {'$limit': limit + 1},
+                    {'$project': image_reader.projection},
+                ],
+                'as': 'images',
+            }},
+            {'$lookup': {
+                'from': 'media',
+                'localField': 'id',
+                'foreignField': 'albumId',
+                'pipeline': [{'$count': 'imageCount'}],
+                'as': 'count',
+            }},
+        ]
+        albums = await db.albums.aggregate(pipeline).to_list(1)
+        if not albums:
+            raise HTTPException(status_code=404, detail="Album not found")
+        album = albums[0]
+        images = album['images']
+        next_cursor = encode_cursor(images[limit - 1], 'date') if len(images) > limit else None
+        row = album_reader.row(album)
+        row['imageCount'] = album['count'][0]['imageCount'] if album['count'] else 0
+        row['images'] = image_reader.rows(images[:limit])
+        cached = (to_json(row), next_cursor)
+        cache_response(key, cached, ['albums', 'media'], versions)
+    body, next_cursor = cached
+    set_next_cursor(response, next_cursor)
+    return json_response(response, body)
+
+
+# Deleting an album also deletes its images, see delete_album
+crud_routes(albums, AlbumCreate, '/albums', delete=False)
 
 
 @router.delete('/albums/{album_id}')
-async def delete_album(album_id: str, _: dict = Depends(verify_token)):
-    # Delete album and its images
-    await db.media.delete_many({'albumId': album_id})
-    result = await db.albums.delete_one({'id': album_id})
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Album not found")
-    return {'success': True}
+async def delete_album(album_id: str, background_tasks: BackgroundTasks, _: dict = Depends(verify_token)):
+    """
+    Delete the album and its images in one transaction. Their blob references
+    and the files nothing else uses are removed by a background job, whose id
+    is returned as `cleanup` (progress at GET /admin/cleanup/{id}).
+    """
+    async def cascade(session):
+        # The album first: an unknown id ends here, before media is touched
+        album = await albums.delete(album_id, write_projection(albums), session=session)
+        projection = media.projection({'id': 1, **write_projection(media)})
+        images = await media.documents.find({'albumId': album_id}, projection, session=session).to_list(None)
+        await media.documents.delete_many({'albumId': album_id}, session=session)
+        return album, images
+
+    album, images = await in_transaction(db, cascade)
+    invalidate('albums', 'media')
+    search_index.remove_album_media(album_id)
+    for image in images:
+        facet_counts.apply('media', image, None)
+    job = file_cleanup.submit(db, [('albums', album)] + [('media', image) for image in images], albumId=album_id)
+    background_tasks.add_task(snapshots.refresh, 'albums', 'media', album_ids=[album_id])
+    return {'success': True, 'cleanup': job['id']}
 
 
 # ==================== MEDIA IMAGES ====================
 
 @router.get('/media', response_model=List[MediaImage])
-async def get_media(albumId: Optional[str] = None):
-    query = {'albumId': albumId} if albumId else {}
-    images = await db.media.find(query).sort('date', -1).to_list(1000)
-    return [MediaImage(**img) for img in images]
-
-
-@router.post('/media', response_model=MediaImage)
-async def create_media(data: MediaImageCreate, _: dict = Depends(verify_token)):
-    image = MediaImage(**data.dict())
-    await db.media.insert_one(image.dict())
-    return image
-
+async def get_media(
+    request: Request,
+    response: Response,
+    albumId: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    stream: bool = False,
+    category: Optional[str] = None,
+):
+    selected = parse_fields(MediaImage, fields)
+    fmt = stream_format(request, stream)
+    key = response_cache.key('media', albumId=albumId, limit=limit, cursor=cursor, fields=selected, stream=fmt,
+                             category=category)
+    unchanged = not_modified(request, response, key, 'media')
+    if unchanged:
+        return unchanged
+    query = {}
+    if albumId:
+        query['albumId'] = albumId
+    if category:
+        query['category'] = category
+    reader = trusted_reader(MediaImage, selected)
+    if fmt:
+        documents = find_sorted(db.media, query, 'date', cursor, reader.projection)
+        return stream_documents(fmt, documents, reader.encode_one, response.headers)
+    cached = response_cache.get(key)
+    if cached is None:
+        versions = collection_versions.snapshot(['media'])
+        images, next_cursor = await fetch_page(db.media, query, 'date', limit, cursor, reader.projection)
+        cached = (reader.encode(images), next_cursor)
+        cache_response(key, cached, ['media'], versions)
+    body, next_cursor = cached
+    set_next_cursor(response, next_cursor)
+    return json_response(response, body)
+
+
+crud_routes(media, MediaImageCreate, '/media', update=False)
+
+
+@router.post('/media/bulk', response_model=BulkMediaResult)
+async def create_media_bulk(
+    background_tasks: BackgroundTasks,
+    albumId: str = Form(...),
+    files: List[UploadFile] = File(...),
+    metadata: Optional[str] = Form(None),
+    _: dict = Depends(verify_token),
+):
+    """
+    Upload many images into an album in one request. `metadata` is an optional
+    JSON array of {title, category}, one per file; titles default to the file
+    name. A file that fails is reported in its item and doesn't stop the rest.
+    """
+    if len(files) > MAX_BULK_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_FILES} files per request")
+    try:
+        details = TypeAdapter(List[MediaImageMetadata]).validate_json(metadata) if metadata else []
+    except ValidationError:
+        raise HTTPException(status_code=400, detail="metadata must be a JSON array of {title, category}")
+    if details and len(details) != len(files):
+        raise HTTPException(status_code=400, detail="metadata must have one entry per file")
+    if not await db.albums.count_documents({'id': albumId}, limit=1):
+        raise HTTPException(status_code=404, detail="Album not found")
 
-@router.delete('/media/{image_id}')
-async def delete_media(image_id: str, _: dict = Depends(verify_token)):
-    result = await db.media.delete_one({'id': image_id})
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Image not found")
-    return {'success': True}
+    semaphore = asyncio.Semaphore(BULK_UPLOAD_CONCURRENCY)
+
+    async def ingest(index: int, file: UploadFile) -> BulkMediaItem:
+        item = BulkMediaItem(index=index, filename=file.filename or '', success=False)
+        if not image_pipeline.is_image(item.filename):
+            item.error = "Not an image"
+            return item
+        async with semaphore:
+            if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+                upload_metrics.rejected += 1
+                item.error = "File too large"
+                return item
+            try:
+                stored = await store_upload(file.file, UPLOAD_DIR, Path(item.filename).suffix)
+                result = await uploaded(stored)
+            except UploadTooLarge:
+                item.error = "File too large"
+                return item
+            except Exception as e:
+                logger.warning(f"Bulk upload of {item.filename} failed: {e}")
+                item.error = "Upload failed"
+                return item
+        meta = details[index] if details else MediaImageMetadata()
+        item.image = MediaImage(
+            title=meta.title or Path(item.filename).stem,
+            category=meta.category or "",
+            url=result['url'],
+            albumId=albumId,
+            **media_fields({result['url']: result['variants']} if result['variants'] else {}, result['info']),
+        )
+        return item
+
+    items = await asyncio.gather(*(ingest(index, file) for index, file in enumerate(files)))
+    pending = [item for item in items if item.image]
+    if pending:
+        try:
+            await db.media.insert_many([item.image.dict() for item in pending], ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                item = pending[error['index']]
+                item.image, item.error = None, "Could not save image"
+        created = [item.image for item in pending if item.image]
+        if created:
+            invalidate('media')
+            for image in created:
+                search_index.add('media', image.model_dump())
+                facet_counts.apply('media', None, image.model_dump())
+            await add_references(db, 'media', [image.model_dump() for image in created])
+            background_tasks.add_task(snapshots.refresh, 'media', album_ids=[albumId])
+    for item in items:
+        item.success = item.image is not None
+    created_count = sum(item.success for item in items)
+    return BulkMediaResult(created=created_count, failed=len(items) - created_count, items=items)
 
 
 # ==================== REVIEWS ====================
 
 @router.get('/reviews', response_model=List[Review])
-async def get_reviews():
-    reviews = await db.reviews.find().sort('date', -1).to_list(1000)
-    return [Review(**r) for r in reviews]
-
-
-@router.post('/reviews', response_model=Review)
-async def create_review(data: ReviewCreate, _: dict = Depends(verify_token)):
-    review = Review(**data.dict())
-    await db.reviews.insert_one(review.dict())
-    return review
-
-
-@router.put('/reviews/{review_id}', response_model=Review)
-async def update_review(review_id: str, data: ReviewCreate, _: dict = Depends(verify_token)):
-    existing = await db.reviews.find_one({'id': review_id})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Review not found")
-    
-    updated = {**existing, **data.dict()}
-    await db.reviews.update_one({'id': review_id}, {'$set': data.dict()})
-    return Review(**updated)
-
-
-@router.delete('/reviews/{review_id}')
-async def delete_review(review_id: str, _: dict = Depends(verify_token)):
-    result = await db.reviews.delete_one({'id': review_id})
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Review not found")
-    return {'success': True}
+async def get_reviews(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    selected = parse_fields(Review, fields)
+    key = response_cache.key('reviews', limit=limit, cursor=cursor, fields=selected)
+    unchanged = not_modified(request, response, key, 'reviews')
+    if unchanged:
+        return unchanged
+    cached = response_cache.get(key)
+    if cached is None:
+        versions = collection_versions.snapshot(['reviews'])
+        reader = trusted_reader(Review, selected)
+        reviews, next_cursor = await fetch_page(db.reviews, {}, 'date', limit, cursor, reader.projection)
+        cached = (reader.encode(reviews), next_cursor)
+        cache_response(key, cached, ['reviews'], versions)
+    body, next_cursor = cached
+    set_next_cursor(response, next_cursor)
+    return json_response(response, body)
+
+
+crud_routes(reviews, ReviewCreate, '/reviews')
 
 
 # ==================== CONTACT ====================
 
 @router.get('/contact', response_model=List[ContactMessage])
-async def get_contact_messages(_: dict = Depends(verify_token)):
-    messages = await db.contact.find().sort('date', -1).to_list(1000)
-    return [ContactMessage(**m) for m in messages]
+async def get_contact_messages(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    _: dict = Depends(verify_token),
+):
+    reader = trusted_reader(ContactMessage)
+    fmt = stream_format(request, stream)
+    if fmt:
+        documents = find_sorted(db.contact, {}, 'date', cursor, reader.projection)
+        return stream_documents(fmt, documents, reader.encode_one)
+    messages, next_cursor = await fetch_page(db.contact, {}, 'date', limit, cursor, reader.projection)
+    set_next_cursor(response, next_cursor)
+    return json_response(response, reader.encode(messages))
 
 
 @router.post('/contact', response_model=ContactMessage)
 async def create_contact_message(data: ContactMessageCreate, background_tasks: BackgroundTasks):
     message = ContactMessage(**data.dict())
-    await db.contact.insert_one(message.dict())
+    await contact.insert(message.model_dump())
     
     # Send email notification in background
     background_tasks.add_task(
@@ -238,50 +679,531 @@ async def create_contact_message(data: ContactMessageCreate, background_tasks: B
 
 @router.put('/contact/{message_id}/read')
 async def mark_message_read(message_id: str, _: dict = Depends(verify_token)):
-    result = await db.contact.update_one({'id': message_id}, {'$set': {'read': True}})
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Message not found")
+    await contact.update(message_id, {'read': True})
     return {'success': True}
 
 
 @router.delete('/contact/{message_id}')
 async def delete_contact_message(message_id: str, _: dict = Depends(verify_token)):
-    result = await db.contact.delete_one({'id': message_id})
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Message not found")
+    await contact.delete(message_id)
     return {'success': True}
 
 
 # ==================== PROFILE ====================
 
 @router.get('/profile', response_model=Profile)
-async def get_profile():
-    profile = await db.profile.find_one({})
-    if profile:
-        return Profile(**profile)
-    # Return default profile
-    return Profile()
+async def get_profile(request: Request, response: Response):
+    key = response_cache.key('profile')
+    unchanged = not_modified(request, response, key, 'profile')
+    if unchanged:
+        return unchanged
+    body = response_cache.get(key)
+    if body is None:
+        versions = collection_versions.snapshot(['profile'])
+        reader = trusted_reader(Profile)
+        profile = await db.profile.find_one({}, reader.projection)
+        # Fall back to the default profile
+        body = reader.encode_one(profile or {})
+        cache_response(key, body, ['profile'], versions)
+    return json_response(response, body)
 
 
 @router.put('/profile', response_model=Profile)
-async def update_profile(data: Profile, _: dict = Depends(verify_token)):
+async def update_profile(data: Profile, background_tasks: BackgroundTasks, _: dict = Depends(verify_token)):
     await db.profile.delete_many({})
     await db.profile.insert_one(data.dict())
+    invalidate('profile')
+    background_tasks.add_task(snapshots.refresh, 'profile')
     return data
 
 
+# ==================== HOME ====================
+
+@router.get('/home', response_model=HomeData)
+async def get_home(request: Request, response: Response):
+    key = response_cache.key('home')
+    unchanged = not_modified(request, response, key, 'profile', 'projects', 'reviews', 'albums')
+    if unchanged:
+        return unchanged
+    body = response_cache.get(key)
+    if body is None:
+        sources = ['profile', 'projects', 'reviews', 'albums']
+        versions = collection_versions.snapshot(sources)
+        body = await build_home(db)
+        cache_response(key, body, sources, versions)
+    return json_response(response, body)
+
+
+# ==================== FACETS ====================
+
+@router.get('/facets')
+async def get_facets(request: Request, response: Response):
+    key = response_cache.key('facets')
+    unchanged = not_modified(request, response, key, 'projects', 'media')
+    if unchanged:
+        return unchanged
+    return facet_counts.snapshot()
+
+
+# ==================== SEARCH ====================
+
+@router.get('/search', response_model=List[SearchHit])
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    type: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+):
+    if type and type not in SEARCH_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Unknown type: {type}")
+    return search_index.search(q, collection=type, limit=limit)
+
+
+# ==================== IMPORT / EXPORT ====================
+
+TRANSFER_REPOSITORIES = {repository.collection: repository for repository in (projects, reviews, albums, media)}
+
+
+def transfer_repository(collection: str) -> Repository:
+    repository = TRANSFER_REPOSITORIES.get(collection)
+    if not repository:
+        raise HTTPException(status_code=404, detail=f"Unknown collection: {collection}")
+    return repository
+
+
+@router.get('/admin/export/{collection}')
+async def export_documents(
+    collection: str,
+    format: str = Query('ndjson', pattern='^(ndjson|json)$'),
+    _: dict = Depends(verify_token),
+):
+    """Every document of `collection`, streamed in the format POST /admin/import/{collection} reads."""
+    repository = transfer_repository(collection)
+    reader = trusted_reader(repository.model)
+    documents = repository.documents.find({}, reader.projection).sort('id', 1)
+    headers = {'Content-Disposition': f'attachment; filename="{collection}.{format}"'}
+    return stream_documents(format, documents, reader.encode_one, headers)
+
+
+def import_failed(result: ImportResult, record: int, error: str):
+    result.failed += 1
+    if len(result.errors) < REPORT_ERRORS:
+        result.errors.append(ImportFailure(record=record, error=error))
+
+
+async def import_batch(repository: Repository, batch: list, result: ImportResult) -> set:
+    """
+    Validate and upsert one batch of records; return the snapshot scope
+    values (project or album ids) it touched. Sets `result.stopped` when an
+    ordered import has to end here.
+    """
+    collection = repository.collection
+    valid, invalid = validate_batch(repository.model, batch)
+    result.received += len(batch)
+    if result.ordered and invalid:
+        # Write what came before the first invalid record, then stop
+        valid = [(record, item) for record, item in valid if record < invalid[0][0]]
+        invalid = invalid[:1]
+        result.stopped = True
+    for record, error in invalid:
+        import_failed(result, record, error)
+
+    records, docs = [], []
+    for record, item in valid:
+        doc = item.model_dump()
+        # Documents from an export carry their image fields; new ones get them derived
+        if collection in REFERENCE_FIELDS and 'variants' not in item.model_fields_set:
+            doc.update(await derived_fields(collection, doc))
+        records.append(record)
+        docs.append(doc)
+    if not docs:
+        return set()
+    try:
+        written = await repository.documents.bulk_write(upserts(docs), ordered=result.ordered)
+        result.inserted += written.upserted_count
+        result.updated += written.matched_count
+    except BulkWriteError as e:
+        failed = {error['index']: error['errmsg'] for error in e.details.get('writeErrors', [])}
+        for index, message in sorted(failed.items()):
+            import_failed(result, records[index], message)
+        result.inserted += e.details.get('nUpserted', 0)
+        result.updated += e.details.get('nMatched', 0)
+        if result.ordered:
+            docs = docs[:min(failed)]
+            result.stopped = True
+        else:
+            docs = [doc for index, doc in enumerate(docs) if index not in failed]
+
+    if collection in SEARCH_FIELDS:
+        for doc in docs:
+            search_index.add(collection, doc)
+    if collection in REFERENCE_FIELDS:
+        # Replaced documents may have used other uploads
+        await drop_references(db, collection, [doc['id'] for doc in docs])
+        await add_references(db, collection, docs)
+    field = repository.scope[1] if repository.scope else None
+    return {doc[field] for doc in docs if doc.get(field)} if field else set()
+
+
+@router.post('/admin/import/{collection}', response_model=ImportResult)
+async def import_documents(
+    request: Request,
+    collection: str,
+    background_tasks: BackgroundTasks,
+    ordered: bool = True,
+    _: dict = Depends(verify_token),
+):
+    """
+    Upsert documents from an NDJSON (Content-Type: application/x-ndjson) or
+    JSON array body, by `id`. With `ordered` the import stops at the first
+    invalid or failed record; otherwise those are skipped and reported.
+    """
+    repository = transfer_repository(collection)
+    if NDJSON in request.headers.get('content-type', ''):
+        records = ndjson_records(request.stream())
+    else:
+        try:
+            records = json_records(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be NDJSON or a JSON array")
+    result = ImportResult(collection=collection, ordered=ordered)
+    scope = set()
+    try:
+        async for batch in batched(records):
+            scope |= await import_batch(repository, batch, result)
+            if result.stopped:
+                break
+    except ImportLineTooLong as e:
+        import_failed(result, e.record, str(e))
+        result.stopped = True
+    finally:
+        if result.inserted or result.updated:
+            invalidate(collection)
+            if collection in FACET_FIELDS:
+                await facet_counts.rebuild_collection(db, collection)
+            scope_args = {repository.scope[0]: sorted(scope)} if repository.scope else {}
+            background_tasks.add_task(snapshots.refresh, collection, **scope_args)
+    return result
+
+
 # ==================== FILE UPLOAD ====================
 
 @router.post('/upload')
 async def upload_file(file: UploadFile = File(...), _: dict = Depends(verify_token)):
-    # Generate unique filename
-    ext = Path(file.filename).suffix
-    filename = f"{uuid.uuid4()}{ext}"
-    filepath = UPLOAD_DIR / filename
-    
-    # Save file
-    with open(filepath, 'wb') as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        upload_metrics.rejected += 1
+        raise HTTPException(status_code=413, detail="File too large")
+    # Copy off the event loop, with the size limit enforced while streaming
+    try:
+        stored = await store_upload(file.file, UPLOAD_DIR, Path(file.filename).suffix)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="File too large")
+    return await uploaded(stored)
+
+
+async def uploaded(stored: StoredUpload, published: bool = False) -> dict:
+    """
+    Register a stored file, copy it and its variants to storage (unless
+    `published`, i.e. it was sent there directly) and describe it the way
+    every upload endpoint responds.
+    """
+    await register_blob(db, stored)
+    # Images are processed once per file; a repeated upload reuses the result
+    blob = await db.blobs.find_one({'id': stored.filename}, {'_id': 0, 'variants': 1, 'info': 1})
+    if blob and 'variants' in blob:
+        variants, info = blob['variants'], blob.get('info')
+        keys = [] if stored.deduplicated else [stored.filename]
+    else:
+        processed = await image_pipeline.generate(stored.filename)
+        if processed is None:
+            # Left unset, so the backfill tries again
+            variants, info = {}, None
+        else:
+            variants, info = processed
+            await db.blobs.update_one({'id': stored.filename}, {'$set': {'variants': variants, 'info': info}})
+        keys = upload_keys(stored.filename, variants)
+    await storage.publish(key for key in keys if not (published and key == stored.filename))
+
     # Return URL
-    return {'url': f'/api/uploads/{filename}'}
+    return {
+        'url': f'/api/uploads/{stored.filename}',
+        'size': stored.size,
+        'sha256': stored.sha256,
+        'deduplicated': stored.deduplicated,
+        'variants': variants,
+        'info': info,
+    }
+
+
+@router.post('/upload/sessions', response_model=UploadSession)
+async def create_upload_session(data: UploadSessionCreate, _: dict = Depends(verify_token)):
+    if data.size > MAX_UPLOAD_BYTES:
+        upload_metrics.rejected += 1
+        raise HTTPException(status_code=413, detail="File too large")
+    upload_sessions.sweep()
+    return upload_sessions.create(data.filename, data.size)
+
+
+@router.get('/upload/sessions/{session_id}', response_model=UploadSession)
+async def get_upload_session(session_id: str, _: dict = Depends(verify_token)):
+    session = upload_sessions.get(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+
+@router.patch('/upload/sessions/{session_id}', response_model=UploadSession)
+async def append_upload_session(
+    request: Request,
+    session_id: str,
+    offset: int = Header(..., alias='Upload-Offset'),
+    _: dict = Depends(verify_token),
+):
+    """Append the raw request body at `Upload-Offset`, which must match the session's offset."""
+    try:
+        session = await upload_sessions.append(session_id, offset, request.stream())
+    except UploadOffsetMismatch as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={'Upload-Offset': str(e.offset)})
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="Chunk goes past the declared size")
+    except ClientDisconnect:
+        # What arrived is on disk; the client resumes from the session's offset
+        return Response(status_code=400)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+
+@router.post('/upload/sessions/{session_id}/finalize')
+async def finalize_upload_session(session_id: str, _: dict = Depends(verify_token)):
+    try:
+        stored = await upload_sessions.finalize(session_id)
+    except UploadIncomplete as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not stored:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return await uploaded(stored)
+
+
+@router.delete('/upload/sessions/{session_id}')
+async def delete_upload_session(session_id: str, _: dict = Depends(verify_token)):
+    if not upload_sessions.get(session_id):
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    upload_sessions.delete(session_id)
+    return {'success': True}
+
+
+@router.post('/upload/presign')
+async def presign_upload(data: PresignedUploadCreate, _: dict = Depends(verify_token)):
+    """
+    A URL the browser PUTs the file to, straight into storage, followed by
+    POST /upload/presign/complete. A file that is already stored needs no
+    upload and is returned like POST /upload would.
+    """
+    if data.size > MAX_UPLOAD_BYTES:
+        upload_metrics.rejected += 1
+        raise HTTPException(status_code=413, detail="File too large")
+    key = upload_name(data.sha256, Path(data.filename).suffix)
+    if not UPLOAD_KEY.match(key):
+        raise HTTPException(status_code=400, detail="Unsupported file name")
+    if await storage.size(key) == data.size:
+        blob = await db.blobs.find_one({'id': key, 'variants': {'$exists': True}}, {'_id': 0, 'id': 1})
+        if blob:
+            # Registered, so checked against its key already
+            stored = StoredUpload(key, data.size, data.sha256, 0.0, True)
+            upload_metrics.record(stored)
+            return await uploaded(stored, published=True)
+        # Never registered: a PUT without /upload/presign/complete, or left unprocessed
+        stored = await verify_stored_upload(key, data.size, deduplicated=True)
+        if stored:
+            return await uploaded(stored, published=True)
+    return {'key': key, 'upload': storage.presign_put(key, data.contentType)}
+
+
+@router.put('/upload/direct/{key}')
+async def put_direct_upload(request: Request, key: str, expires: int, signature: str):
+    """The presigned PUT target of local storage; the body has to hash to `key`."""
+    if storage.remote:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not UPLOAD_KEY.match(key) or not storage.verify(key, request.headers.get('content-type', ''), expires, signature):
+        raise HTTPException(status_code=403, detail="Invalid or expired signature")
+    tmp = UPLOAD_DIR / f".{os.urandom(8).hex()}.part"
+    try:
+        _, sha256 = await receive_stream(request.stream(), tmp, MAX_UPLOAD_BYTES)
+        if upload_name(sha256, Path(key).suffix) != key:
+            raise HTTPException(status_code=400, detail="Content doesn't match its key")
+        place_upload(tmp, UPLOAD_DIR, sha256, Path(key).suffix)
+    except UploadTooLarge:
+        upload_metrics.rejected += 1
+        raise HTTPException(status_code=413, detail="File too large")
+    finally:
+        tmp.unlink(missing_ok=True)
+    return Response(status_code=200)
+
+
+@router.post('/upload/presign/complete')
+async def complete_presigned_upload(data: PresignedUploadComplete, _: dict = Depends(verify_token)):
+    """Check a file PUT to a presigned URL against its key and register it."""
+    if not UPLOAD_KEY.match(data.key):
+        raise HTTPException(status_code=400, detail="Invalid key")
+    size = await storage.size(data.key)
+    if size is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if size > MAX_UPLOAD_BYTES:
+        await storage.delete([data.key])
+        upload_metrics.rejected += 1
+        raise HTTPException(status_code=413, detail="File too large")
+    stored = await verify_stored_upload(data.key, size)
+    if stored is None:
+        raise HTTPException(status_code=400, detail="Content doesn't match its key")
+    return await uploaded(stored, published=True)
+
+
+async def verify_stored_upload(key: str, size: int, deduplicated: bool = False) -> Optional[StoredUpload]:
+    """
+    Fetch a file PUT straight to storage and check it hashes to `key`. One
+    that doesn't is deleted and None returned.
+    """
+    # The bytes are read once more here, to verify them and to make the variants
+    started = time.perf_counter()
+    path = await storage.fetch(key)
+    if path is None:
+        return None
+    sha256 = await asyncio.to_thread(hash_file, path)
+    if upload_name(sha256, Path(key).suffix) != key:
+        await storage.delete([key])
+        return None
+    await asyncio.to_thread(write_compressed_sibling, path)
+    stored = StoredUpload(key, size, sha256, time.perf_counter() - started, deduplicated)
+    upload_metrics.record(stored)
+    return stored
+
+
+@router.get('/images/{stem}/{width}')
+async def get_image_variant(request: Request, stem: str, width: int):
+    """A variant in the best format the client accepts (AVIF, then WebP, then the fallback)."""
+    if storage.remote:
+        return await redirect_image_variant(request, Path(stem).name, width)
+    match = image_pipeline.negotiate(Path(stem).name, width, request.headers.get('accept', ''))
+    if not match:
+        raise HTTPException(status_code=404, detail="Image not found")
+    path, content_type = match
+    return await upload_files.serve(path, request.scope, media_type=content_type, headers={'Vary': 'Accept'})
+
+
+async def redirect_image_variant(request: Request, stem: str, width: int) -> Response:
+    blob = await db.blobs.find_one(
+        {'id': {'$regex': f'^{re.escape(stem)}\\.'}, 'variants': {'$ne': {}}}, {'_id': 0, 'variants': 1})
+    match = negotiate_variant(blob['variants'], width, request.headers.get('accept', '')) if blob else None
+    if not match:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return upload_files.redirect(match[0], headers={'Vary': 'Accept'})
+
+
+@router.get('/uploads/{filename}')
+async def get_upload(
+    request: Request,
+    filename: str,
+    w: Optional[int] = None,
+    h: Optional[int] = None,
+    fmt: Optional[str] = None,
+):
+    """An uploaded file, or with w/h/fmt a copy resized on first request and cached on disk."""
+    if w is None and h is None and fmt is None:
+        return await upload_files.get_response(filename, request.scope)
+    for value in (w, h):
+        if value is not None and value not in RESIZE_SIZES:
+            raise HTTPException(status_code=400, detail=f"Unsupported size, use one of {', '.join(map(str, RESIZE_SIZES))}")
+    fmt = fmt or 'auto'
+    if fmt not in RESIZE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format, use one of {', '.join(RESIZE_FORMATS)}")
+    source = None if filename.startswith('.') else await storage.fetch(filename)
+    if source is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not image_pipeline.is_image(filename):
+        raise HTTPException(status_code=400, detail="Only images can be resized")
+
+    headers = {}
+    if fmt == 'auto':
+        fmt = accepted_format(request.headers.get('accept', ''), filename)
+        headers['Vary'] = 'Accept'
+    extension, content_type, _ = VARIANT_FORMATS[fmt]
+    stem = Path(filename).stem
+    # A width-only request may already exist among the upload-time variants
+    if w is not None and h is None:
+        variant = image_pipeline.variants_dir / f'{stem}-{w}.{extension}'
+        if variant.is_file():
+            return await upload_files.serve(variant, request.scope, media_type=content_type, headers=headers)
+
+    async def render(target: Path) -> int:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(image_pipeline.pool, resize_image, str(source), str(target), w, h, fmt)
+
+    name = f'{stem}-{w or 0}x{h or 0}.{extension}'
+    try:
+        path = await resize_cache.get(name, render)
+    except Exception as e:
+        logger.warning(f"Could not resize {filename}: {e}")
+        raise HTTPException(status_code=400, detail="Could not resize image")
+    # The copy stays pinned in the cache until the response has been sent
+    try:
+        response = await upload_files.serve(path, request.scope, media_type=content_type, headers=headers)
+    except BaseException:
+        resize_cache.release(name)
+        raise
+    response.background = BackgroundTask(resize_cache.release, name)
+    return response
+
+
+@router.get('/admin/uploads/stats')
+async def get_upload_stats(_: dict = Depends(verify_token)):
+    return {**upload_metrics.stats(), 'resizeCache': resize_cache.stats()}
+
+
+@router.post('/admin/uploads/gc', status_code=202)
+async def start_upload_gc(
+    dryRun: bool = True,
+    graceHours: Optional[float] = Query(None, ge=0),
+    _: dict = Depends(verify_token),
+):
+    """Start collecting orphaned uploads in the background; poll GET for the report."""
+    grace = graceHours * 3600 if graceHours is not None else None
+    if not upload_collector.start(db, dry_run=dryRun, grace=grace):
+        raise HTTPException(status_code=409, detail="Garbage collection is already running")
+    return upload_collector.status
+
+
+@router.get('/admin/uploads/gc')
+async def get_upload_gc(_: dict = Depends(verify_token)):
+    return upload_collector.status
+
+
+@router.get('/admin/cleanup')
+async def get_cleanup_jobs(_: dict = Depends(verify_token)):
+    """Recent cleanup jobs (see delete_album), newest first."""
+    return file_cleanup.list()
+
+
+@router.get('/admin/cleanup/{job_id}')
+async def get_cleanup_job(job_id: str, _: dict = Depends(verify_token)):
+    job = file_cleanup.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Cleanup job not found")
+    return job
+
+
+@router.get('/admin/blobs', response_model=List[Blob])
+async def get_blobs(
+    unreferenced: bool = False,
+    limit: int = Query(100, ge=1, le=1000),
+    _: dict = Depends(verify_token),
+):
+    query = {'refs': {'$size': 0}} if unreferenced else {}
+    return await db.blobs.find(query, {'_id': 0}).sort('id', 1).limit(limit).to_list(limit)
+
+
+@router.get('/admin/blobs/{filename}', response_model=Blob)
+async def get_blob(filename: str, _: dict = Depends(verify_token)):
+    blob = await db.blobs.find_one({'id': filename}, {'_id': 0})
+    if not blob:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return blob
\ No newline at end of file
@@ -0,0 +1,158 @@
+"""
+In-memory full-text search over projects, media and reviews.
+
+An inverted index (term -> {document: term frequency}) is built once at
+startup and then kept current by the write handlers, so a query never
+touches MongoDB. Text is folded to lowercase ASCII, which makes Romanian
+diacritics optional ("stiinta" finds "știință"), documents are ranked with
+BM25 and the last query word matches as a prefix for search-as-you-type.
+"""
+import logging
+import math
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r'[a-z0-9]+')
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+MAX_PREFIX_EXPANSIONS = 64
+
+# collection -> [(field, weight)]; weight repeats the field's terms
+SEARCH_FIELDS = {
+    'projects': [('title', 3), ('technologies', 2), ('description', 1), ('longDescription', 1)],
+    'media': [('title', 3), ('category', 2)],
+    'reviews': [('content', 1), ('name', 2)],
+}
+
+
+def fold(text: str) -> str:
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN.findall(fold(text))
+
+
+def document_terms(collection: str, doc: dict) -> Dict[str, int]:
+    counts = defaultdict(int)
+    for field, weight in SEARCH_FIELDS[collection]:
+        value = doc.get(field) or ''
+        if isinstance(value, list):
+            value = ' '.join(value)
+        for term in tokenize(value):
+            counts[term] += weight
+    return counts
+
+
+def document_summary(collection: str, doc: dict) -> dict:
+    if collection == 'projects':
+        return {'title': doc.get('title', ''), 'image': doc.get('image', ''), 'albumId': None}
+    if collection == 'media':
+        return {'title': doc.get('title', ''), 'image': doc.get('url', ''), 'albumId': doc.get('albumId')}
+    return {'title': doc.get('name', ''), 'image': '', 'albumId': None}
+
+
+class SearchIndex:
+    def __init__(self):
+        self.postings: Dict[str, Dict[Tuple[str, str], int]] = defaultdict(dict)
+        self.terms: List[str] = []  # sorted, for prefix lookups
+        self.lengths: Dict[Tuple[str, str], int] = {}
+        self.documents: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self.summaries: Dict[Tuple[str, str], dict] = {}
+        self.total_length = 0
+
+    def add(self, collection: str, doc: dict):
+        key = (collection, doc['id'])
+        self.remove(collection, doc['id'])
+        terms = document_terms(collection, doc)
+        for term, count in terms.items():
+            if term not in self.postings:
+                insort(self.terms, term)
+            self.postings[term][key] = count
+        self.documents[key] = terms
+        self.lengths[key] = sum(terms.values())
+        self.total_length += self.lengths[key]
+        self.summaries[key] = document_summary(collection, doc)
+
+    def remove(self, collection: str, doc_id: str):
+        key = (collection, doc_id)
+        terms = self.documents.pop(key, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self.postings[term]
+            postings.pop(key, None)
+            if not postings:
+                del self.postings[term]
+                self.terms.pop(bisect_left(self.terms, term))
+        self.total_length -= self.lengths.pop(key)
+        self.summaries.pop(key, None)
+
+    def remove_album_media(self, album_id: str):
+        stale = [key for key, summary in self.summaries.items()
+                 if key[0] == 'media' and summary['albumId'] == album_id]
+        for collection, doc_id in stale:
+            self.remove(collection, doc_id)
+
+    def expand_prefix(self, prefix: str) -> List[str]:
+        start = bisect_left(self.terms, prefix)
+        matches = []
+        for term in self.terms[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def search(self, query: str, collection: Optional[str] = None, limit: int = 20) -> List[dict]:
+        words = tokenize(query)
+        if not words or not self.documents:
+            return []
+        total_docs = len(self.documents)
+        average_length = self.total_length / total_docs
+        scores: Optional[Dict[Tuple[str, str], float]] = None
+        for position, word in enumerate(words):
+            is_last = position == len(words) - 1
+            candidates = self.expand_prefix(word) if is_last else [word]
+            # Best-matching expansion per document, so a short prefix doesn't
+            # reward documents for containing many different completions
+            word_scores: Dict[Tuple[str, str], float] = {}
+            for term in candidates:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, tf in postings.items():
+                    if collection and key[0] != collection:
+                        continue
+                    norm = K1 * (1 - B + B * self.lengths[key] / average_length)
+                    score = idf * tf * (K1 + 1) / (tf + norm)
+                    if score > word_scores.get(key, 0.0):
+                        word_scores[key] = score
+            # Every query word has to match
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {key: total + word_scores[key] for key, total in scores.items() if key in word_scores}
+            if not scores:
+                return []
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [
+            {'type': key[0], 'id': key[1], 'score': round(score, 4), **self.summaries[key]}
+            for key, score in ranked
+        ]
+
+    async def rebuild(self, db):
+        self.__init__()
+        for collection, fields in SEARCH_FIELDS.items():
+            projection = {'_id': 0, 'id': 1, 'image': 1, 'url': 1, 'albumId': 1, **{f: 1 for f, _ in fields}}
+            async for doc in db[collection].find({}, projection):
+                self.add(collection, doc)
+        logger.info(f"Search index built: {len(self.documents)} documents, {len(self.terms)} terms")
@@ -1,5 +1,5 @@
 from fastapi import FastAPI, APIRouter
-from fastapi.staticfiles import StaticFiles
+import asyncio
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -10,7 +10,13 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-from routes import router as api_routes, set_db
+from routes import (
+    router as api_routes, set_db, snapshots, search_index, facet_counts, image_pipeline, upload_files, upload_sessions,
+    upload_collector, SNAPSHOT_DIR
+)
+from indexes import ensure_indexes
+from upload_gc import UPLOAD_GC_INTERVAL
+from static_files import PrecompressedStaticFiles
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
@@ -23,13 +29,6 @@ set_db(db)
 # Create the main app
 app = FastAPI(title="LWR Portfolio API")
 
-# Create uploads directory
-UPLOAD_DIR = ROOT_DIR / 'uploads'
-UPLOAD_DIR.mkdir(exist_ok=True)
-
-# Mount static files for uploads
-app.mount("/api/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
-
 # Create a router with the /api prefix
 main_router = APIRouter(prefix="/api")
 
@@ -44,12 +43,20 @@ main_router.include_router(api_routes)
 # Include the router in the main app
 app.include_router(main_router)
 
+# Mount static files for uploads. Files directly under /api/uploads go through
+# the resizing route above; this mount serves the nested variants/ directory.
+app.mount("/api/uploads", upload_files, name="uploads")
+
+# Mount precompressed snapshots of the public API
+app.mount("/api/snapshots", PrecompressedStaticFiles(directory=str(SNAPSHOT_DIR)), name="snapshots")
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Upload-Offset"],
 )
 
 # Configure logging
@@ -62,14 +69,19 @@ logger = logging.getLogger(__name__)
 @app.on_event("startup")
 async def startup_db_client():
     logger.info("Connected to MongoDB")
-    # Create indexes
-    await db.projects.create_index("id", unique=True)
-    await db.albums.create_index("id", unique=True)
-    await db.media.create_index("id", unique=True)
-    await db.reviews.create_index("id", unique=True)
-    await db.contact.create_index("id", unique=True)
+    # Reconcile the indexes declared in models.py
+    await ensure_indexes(db)
+    await search_index.rebuild(db)
+    await facet_counts.rebuild(db)
+    # Resumable uploads abandoned while the server was down
+    upload_sessions.sweep()
+    # Rebuild every snapshot without delaying startup
+    app.state.snapshot_task = asyncio.create_task(snapshots.publish_all())
+    if UPLOAD_GC_INTERVAL > 0:
+        app.state.upload_gc_task = asyncio.create_task(upload_collector.run_periodically(db, UPLOAD_GC_INTERVAL))
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    image_pipeline.shutdown()
     client.close()
     logger.info("Disconnected from MongoDB")
@@ -0,0 +1,181 @@
+"""
+Static snapshots of the public API.
+
+Every public GET response is rendered to a JSON file (plus a gzip sibling)
+under SNAPSHOT_DIR, which server.py serves at /api/snapshots through
+PrecompressedStaticFiles. Write handlers refresh only the files their change
+affects, so reads keep working at static-file cost even while MongoDB is
+slow or down.
+
+    projects.json, projects/<id>.json, albums.json, media.json,
+    media/<albumId>.json, reviews.json, profile.json, home.json
+"""
+import asyncio
+import gzip
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Iterable, Optional
+
+from pydantic_core import to_json
+
+from models import Project, Album, MediaImage, Review, Profile, trusted_reader
+from pagination import sort_spec
+
+logger = logging.getLogger(__name__)
+
+SAFE_ID = re.compile(r'^[A-Za-z0-9_-]+$')
+
+HOME_FEATURED_PROJECTS = 2
+HOME_LATEST_REVIEWS = 3
+HOME_LATEST_ALBUMS = 5
+
+
+def latest(collection, query: dict, sort_field: str, count: int, projection: dict):
+    return collection.find(query, projection).sort(sort_spec(sort_field)).limit(count).to_list(count)
+
+
+async def build_home(db) -> bytes:
+    """The /api/home document: profile, featured projects, latest reviews and albums, and the counts."""
+    profile_reader = trusted_reader(Profile)
+    project_reader = trusted_reader(Project)
+    review_reader = trusted_reader(Review)
+    album_reader = trusted_reader(Album)
+    profile, projects, reviews, albums, project_count, review_count = await asyncio.gather(
+        db.profile.find_one({}, profile_reader.projection),
+        latest(db.projects, {'featured': True}, 'createdAt', HOME_FEATURED_PROJECTS, project_reader.projection),
+        latest(db.reviews, {}, 'date', HOME_LATEST_REVIEWS, review_reader.projection),
+        latest(db.albums, {}, 'createdAt', HOME_LATEST_ALBUMS, album_reader.projection),
+        db.projects.count_documents({}),
+        db.reviews.count_documents({}),
+    )
+    return to_json({
+        'profile': profile_reader.row(profile or {}),
+        'featuredProjects': project_reader.rows(projects),
+        'latestReviews': review_reader.rows(reviews),
+        'latestAlbums': album_reader.rows(albums),
+        'projectCount': project_count,
+        'reviewCount': review_count,
+    })
+
+
+class SnapshotPublisher:
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.db = None
+        # Changes waiting to be rendered. A single worker drains them, so a
+        # burst of writes coalesces into a few renders and an older render
+        # never overwrites a newer one.
+        self._pending_collections = set()
+        self._pending_projects = set()
+        self._pending_albums = set()
+        self._running = False
+
+    def bind(self, db):
+        self.db = db
+
+    # ---------- file output ----------
+
+    def write(self, name: str, body: bytes):
+        path = self.directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        for target, content in ((path, body), (path.with_name(path.name + '.gz'), gzip.compress(body, 9))):
+            tmp = target.with_name(target.name + '.tmp')
+            tmp.write_bytes(content)
+            os.replace(tmp, target)
+
+    async def save(self, name: str, body: bytes):
+        # gzip level 9 on a large media list shouldn't hold up the event loop
+        await asyncio.to_thread(self.write, name, body)
+
+    def remove(self, name: str):
+        path = self.directory / name
+        for target in (path, path.with_name(path.name + '.gz')):
+            target.unlink(missing_ok=True)
+
+    # ---------- renderers ----------
+
+    async def all_documents(self, collection, model, sort_field: str, query: Optional[dict] = None) -> bytes:
+        reader = trusted_reader(model)
+        docs = await collection.find(query or {}, reader.projection).sort(sort_spec(sort_field)).to_list(None)
+        return reader.encode(docs)
+
+    async def render_project(self, project_id: str):
+        if not SAFE_ID.match(project_id):
+            return
+        reader = trusted_reader(Project)
+        project = await self.db.projects.find_one({'id': project_id}, reader.projection)
+        if project:
+            await self.save(f'projects/{project_id}.json', reader.encode_one(project))
+        else:
+            self.remove(f'projects/{project_id}.json')
+
+    async def render_album_media(self, album_id: str):
+        if not SAFE_ID.match(album_id):
+            return
+        if await self.db.albums.count_documents({'id': album_id}, limit=1):
+            body = await self.all_documents(self.db.media, MediaImage, 'date', {'albumId': album_id})
+            await self.save(f'media/{album_id}.json', body)
+        else:
+            self.remove(f'media/{album_id}.json')
+
+    async def render_profile(self):
+        reader = trusted_reader(Profile)
+        profile = await self.db.profile.find_one({}, reader.projection)
+        await self.save('profile.json', reader.encode_one(profile or {}))
+
+    async def render_home(self):
+        await self.save('home.json', await build_home(self.db))
+
+    # ---------- entry points ----------
+
+    async def refresh(self, *collections: str, project_ids: Iterable[str] = (), album_ids: Iterable[str] = ()):
+        """Re-render the snapshots that depend on `collections` and the given ids."""
+        if self.db is None:
+            return
+        self._pending_collections.update(collections)
+        self._pending_projects.update(project_ids)
+        self._pending_albums.update(album_ids)
+        if self._running:
+            return
+        self._running = True
+        try:
+            while self._pending_collections:
+                collections, self._pending_collections = self._pending_collections, set()
+                project_ids, self._pending_projects = self._pending_projects, set()
+                album_ids, self._pending_albums = self._pending_albums, set()
+                try:
+                    await self.render(collections, project_ids, album_ids)
+                except Exception as e:
+                    logger.error(f"Failed to publish snapshots for {', '.join(sorted(collections))}: {e}")
+        finally:
+            self._running = False
+
+    async def render(self, collections: set, project_ids: set, album_ids: set):
+        if 'projects' in collections:
+            await self.save('projects.json', await self.all_documents(self.db.projects, Project, 'createdAt'))
+            for project_id in project_ids:
+                await self.render_project(project_id)
+        if 'albums' in collections:
+            await self.save('albums.json', await self.all_documents(self.db.albums, Album, 'createdAt'))
+        if 'media' in collections or 'albums' in collections:
+            for album_id in album_ids:
+                await self.render_album_media(album_id)
+        if 'media' in collections:
+            await self.save('media.json', await self.all_documents(self.db.media, MediaImage, 'date'))
+        if 'reviews' in collections:
+            await self.save('reviews.json', await self.all_documents(self.db.reviews, Review, 'date'))
+        if 'profile' in collections:
+            await self.render_profile()
+        if collections & {'projects', 'albums', 'reviews', 'profile'}:
+            await self.render_home()
+
+    async def publish_all(self):
+        if self.db is None:
+            return
+        project_ids = [p['id'] for p in await self.db.projects.find({}, {'_id': 0, 'id': 1}).to_list(None)]
+        album_ids = [a['id'] for a in await self.db.albums.find({}, {'_id': 0, 'id': 1}).to_list(None)]
+        await self.refresh('projects', 'albums', 'media', 'reviews', 'profile',
+                           project_ids=project_ids, album_ids=album_ids)
+        logger.info(f"Published snapshots to {self.directory}")
@@ -0,0 +1,250 @@
+import os
+import re
+import stat
+from mimetypes import guess_type
+from pathlib import PurePath
+from typing import Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, RedirectResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves a `.gz` sibling, when one exists, to clients
+    accepting gzip. Nothing is compressed at request time.
+    """
+
+    def __init__(self, *args, cache_control: str = 'no-cache', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = cache_control
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if self.accepts_gzip(scope) and not path.endswith('.gz'):
+            try:
+                response = await super().get_response(path + '.gz', scope)
+            except HTTPException as e:
+                if e.status_code != 404:
+                    raise
+            else:
+                response.headers['Content-Encoding'] = 'gzip'
+                return self.finalize(response)
+        return self.finalize(await super().get_response(path, scope))
+
+    def finalize(self, response: Response) -> Response:
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = self.cache_control
+        return response
+
+    @staticmethod
+    def accepts_gzip(scope: Scope) -> bool:
+        for name, value in scope.get('headers', []):
+            if name == b'accept-encoding':
+                return b'gzip' in value
+        return False
+
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+CONTENT_HASH = re.compile(r'^[0-9a-f]{64}')
+
+# Content-Encoding -> sibling suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+# Only these are looked up for siblings; images are already compressed
+COMPRESSIBLE_TYPES = {'image/svg+xml', 'text/plain', 'text/csv', 'application/json', 'application/xml', 'text/xml'}
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    The (start, end) byte positions, inclusive, of a single-range `Range`
+    header. None means the header should be ignored and the whole file sent
+    (malformed or multiple ranges, which RFC 9110 allows).
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    # An empty file has no byte to start or end a range at
+    if size == 0:
+        raise RangeNotSatisfiable
+    first, sep, last = spec.strip().partition('-')
+    if not sep:
+        return None
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+class UploadFileResponse(FileResponse):
+    """
+    FileResponse that can send a byte range. The body goes out through the
+    server's zero-copy extension (sendfile) when it offers one and is read
+    in chunks on a worker thread otherwise.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(self, *args, byte_range: Optional[Tuple[int, int]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.byte_range = byte_range
+        size = self.stat_result.st_size
+        if byte_range:
+            start, end = byte_range
+            self.status_code = 206
+            self.headers['content-range'] = f'bytes {start}-{end}/{size}'
+            self.headers['content-length'] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.send_file(scope, send)
+        finally:
+            # Also after a client disconnect, so resources held for the body are freed
+            if self.background is not None:
+                await self.background()
+
+    async def send_file(self, scope: Scope, send: Send) -> None:
+        start, end = self.byte_range or (0, self.stat_result.st_size - 1)
+        count = end - start + 1
+        await send({'type': 'http.response.start', 'status': self.status_code, 'headers': self.raw_headers})
+        extensions = scope.get('extensions') or {}
+        if scope['method'].upper() == 'HEAD' or count == 0:
+            # An empty file still needs its (single, final) body message
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        elif 'http.response.zerocopysend' in extensions:
+            with open(self.path, 'rb') as file:
+                await send({
+                    'type': 'http.response.zerocopysend',
+                    'file': file.fileno(),
+                    'offset': start,
+                    'count': count,
+                })
+        elif 'http.response.pathsend' in extensions and not self.byte_range:
+            await send({'type': 'http.response.pathsend', 'path': str(self.path)})
+        else:
+            remaining = count
+            async with await anyio.open_file(self.path, mode='rb') as file:
+                await file.seek(start)
+                while remaining > 0:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    remaining -= len(chunk)
+                    more_body = remaining > 0 and len(chunk) > 0
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': more_body})
+                    if not more_body:
+                        break
+
+
+class UploadFiles(StaticFiles):
+    """
+    StaticFiles for /api/uploads. Upload names never get reused for other
+    content, so every response is cacheable forever, with a strong ETag
+    derived from the name. Range requests are honoured (single ranges,
+    If-Range aware), dot-files such as in-progress upload sessions are never
+    served, and with `precompressed=True` a `.br`/`.gz` sibling of a text
+    or SVG file is sent to clients accepting that encoding.
+
+    With a remote `storage` (see storage.py) files aren't read from the
+    directory at all: requests are redirected to the bucket.
+    """
+
+    def __init__(self, *args, precompressed: bool = False, storage=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.precompressed = precompressed
+        self.storage = storage
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope['method'] not in ('GET', 'HEAD'):
+            raise HTTPException(status_code=405)
+        if any(part.startswith('.') for part in PurePath(path).parts):
+            raise HTTPException(status_code=404)
+        if self.storage is not None and self.storage.remote:
+            return self.redirect(PurePath(path).as_posix())
+        full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path)
+        if not stat_result or not stat.S_ISREG(stat_result.st_mode):
+            raise HTTPException(status_code=404)
+        return await self.serve(full_path, scope, stat_result=stat_result)
+
+    def redirect(self, key: str, headers: Optional[dict] = None) -> Response:
+        """Send the client to `key` in remote storage."""
+        return RedirectResponse(
+            self.storage.presign_get(key),
+            status_code=307,
+            headers={**(headers or {}), 'cache-control': self.storage.redirect_cache_control},
+        )
+
+    async def serve(self, path, scope: Scope, stat_result: Optional[os.stat_result] = None,
+                    media_type: Optional[str] = None, headers: Optional[dict] = None) -> Response:
+        """Response for a file inside the uploads tree (also used for resized copies)."""
+        request_headers = Headers(scope=scope)
+        path = str(path)
+        name = os.path.basename(path)
+        media_type = media_type or guess_type(name)[0] or 'application/octet-stream'
+        headers = dict(headers or {})
+        headers['cache-control'] = IMMUTABLE
+        headers['accept-ranges'] = 'bytes'
+        if self.precompressed and media_type in COMPRESSIBLE_TYPES:
+            vary = headers.pop('Vary', headers.pop('vary', ''))
+            headers['vary'] = ', '.join(filter(None, [vary, 'Accept-Encoding']))
+            if 'range' not in request_headers:
+                sibling = await anyio.to_thread.run_sync(
+                    self.encoded_sibling, path, request_headers.get('accept-encoding', ''))
+                if sibling:
+                    path, encoding, stat_result = sibling
+                    name = os.path.basename(path)
+                    headers['content-encoding'] = encoding
+        if stat_result is None:
+            stat_result = await anyio.to_thread.run_sync(os.stat, path)
+        headers['etag'] = self.etag(name, stat_result)
+
+        if self.is_not_modified(Headers(headers=headers), request_headers):
+            return NotModifiedResponse(Headers(headers=headers))
+        byte_range = None
+        range_header = request_headers.get('range')
+        if range_header and self.if_range_matches(request_headers.get('if-range'), headers['etag']):
+            try:
+                byte_range = parse_range(range_header, stat_result.st_size)
+            except RangeNotSatisfiable:
+                return Response(status_code=416, headers={'content-range': f'bytes */{stat_result.st_size}'})
+        return UploadFileResponse(path, headers=headers, media_type=media_type,
+                                  stat_result=stat_result, byte_range=byte_range)
+
+    @staticmethod
+    def etag(name: str, stat_result: os.stat_result) -> str:
+        if CONTENT_HASH.match(name):
+            return f'"{name}"'
+        return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+    @staticmethod
+    def if_range_matches(if_range: Optional[str], etag: str) -> bool:
+        # Only strong validators count; a date or weak tag means "send it all"
+        return if_range is None or if_range.strip() == etag
+
+    @staticmethod
+    def encoded_sibling(path: str, accept_encoding: str) -> Optional[tuple]:
+        accepted = {part.split(';')[0].strip() for part in accept_encoding.split(',')}
+        for encoding, suffix in ENCODINGS:
+            if encoding in accepted:
+                try:
+                    stat_result = os.stat(path + suffix)
+                except OSError:
+                    continue
+                if stat.S_ISREG(stat_result.st_mode):
+                    return path + suffix, encoding, stat_result
+        return None
@@ -0,0 +1,250 @@
+"""
+Where uploaded files live.
+
+Uploads are always written, hashed and processed in UPLOAD_DIR first. The
+storage backend decides what happens next:
+
+- LocalStorage (STORAGE_BACKEND=local, the default): UPLOAD_DIR is the
+  store. /api/uploads serves it.
+- S3Storage (STORAGE_BACKEND=s3): originals and variants are copied to an
+  S3-compatible bucket (AWS, MinIO, ...) shared by every app instance.
+  /api/uploads redirects there, and UPLOAD_DIR is only a local working
+  copy. The .gz siblings stay local: a redirect always names the original,
+  so compressing text in transit is left to the bucket's CDN.
+
+Both hand out presigned URLs so a browser can PUT a file straight to the
+store and GET it back without the bytes passing through the API. For local
+storage the "presigned" PUT is an HMAC-signed /api/upload/direct URL.
+
+    S3_BUCKET, S3_ENDPOINT_URL (e.g. http://minio:9000), S3_REGION,
+    S3_ACCESS_KEY_ID, S3_SECRET_ACCESS_KEY, S3_PREFIX, S3_PUBLIC_URL
+"""
+import asyncio
+import hashlib
+import hmac
+import os
+import time
+from mimetypes import guess_type
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from uploads import UPLOAD_URL_PREFIX
+
+PRESIGN_EXPIRES = int(os.environ.get('PRESIGN_EXPIRES', '900'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+DELETE_BATCH_SIZE = 1000
+
+
+def scan_directory(directory: Path) -> List[tuple]:
+    """(name, size, mtime) of the regular, non-hidden files directly in `directory`."""
+    if not directory.is_dir():
+        return []
+    files = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.startswith('.') or not entry.is_file(follow_symlinks=False):
+                continue
+            stat = entry.stat(follow_symlinks=False)
+            files.append((entry.name, stat.st_size, stat.st_mtime))
+    return files
+
+
+def remove_files(paths: Iterable[Path]) -> int:
+    removed = 0
+    for path in paths:
+        try:
+            removed += path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+class LocalStorage:
+    remote = False
+
+    def __init__(self, directory: Path, secret: str):
+        self.directory = directory
+        self.secret = secret.encode()
+
+    async def publish(self, keys: Iterable[str]):
+        """Make files already written to the upload directory available; nothing to do here."""
+
+    async def fetch(self, key: str) -> Optional[Path]:
+        path = self.directory / key
+        return path if path.is_file() else None
+
+    async def size(self, key: str) -> Optional[int]:
+        try:
+            return (self.directory / key).stat().st_size
+        except FileNotFoundError:
+            return None
+
+    async def scan(self, prefix: str = '') -> List[Tuple[str, int, float]]:
+        """(name, size, mtime) of the visible files directly under `prefix`."""
+        return await asyncio.to_thread(scan_directory, self.directory / prefix)
+
+    async def delete(self, keys: Iterable[str]):
+        await asyncio.to_thread(remove_files, [self.directory / key for key in keys])
+
+    # ---------- presigned URLs ----------
+
+    def signature(self, key: str, content_type: str, expires: int) -> str:
+        message = f'{key}\n{content_type}\n{expires}'.encode()
+        return hmac.new(self.secret, message, hashlib.sha256).hexdigest()
+
+    def presign_put(self, key: str, content_type: str, expires_in: int = PRESIGN_EXPIRES) -> dict:
+        expires = int(time.time()) + expires_in
+        query = urlencode({'expires': expires, 'signature': self.signature(key, content_type, expires)})
+        return {'method': 'PUT', 'url': f'/api/upload/direct/{key}?{query}', 'headers': {'Content-Type': content_type}}
+
+    def verify(self, key: str, content_type: str, expires: int, signature: str) -> bool:
+        return expires >= time.time() and hmac.compare_digest(signature, self.signature(key, content_type, expires))
+
+    def presign_get(self, key: str, expires_in: int = PRESIGN_EXPIRES) -> str:
+        return f'/api/uploads/{key}'
+
+
+class S3Storage:
+    remote = True
+
+    def __init__(self, directory: Path, bucket: str, prefix: str = '', public_url: Optional[str] = None,
+                 **client_options):
+        import boto3
+        from botocore.config import Config
+
+        self.directory = directory
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.public_base = public_url.rstrip('/') if public_url else None
+        self.client = boto3.client('s3', config=Config(signature_version='s3v4'), **client_options)
+
+    def object_key(self, key: str) -> str:
+        return self.prefix + key
+
+    def upload(self, key: str):
+        path = self.directory / key
+        extra = {'CacheControl': IMMUTABLE, 'ContentType': content_type(key)}
+        self.client.upload_file(str(path), self.bucket, self.object_key(key), ExtraArgs=extra)
+
+    async def publish(self, keys: Iterable[str]):
+        """Copy files from the upload directory to the bucket."""
+        for key in keys:
+            if (self.directory / key).is_file():
+                await asyncio.to_thread(self.upload, key)
+
+    async def fetch(self, key: str) -> Optional[Path]:
+        """A local copy of `key`, downloaded on first use."""
+        path = self.directory / key
+        if path.is_file():
+            return path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'.{path.name}.{os.urandom(4).hex()}.download')
+        try:
+            await asyncio.to_thread(self.client.download_file, self.bucket, self.object_key(key), str(tmp))
+            os.replace(tmp, path)
+        except Exception as e:
+            if not is_missing(e):
+                raise
+            return None
+        finally:
+            tmp.unlink(missing_ok=True)
+        return path
+
+    async def size(self, key: str) -> Optional[int]:
+        try:
+            head = await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=self.object_key(key))
+        except Exception as e:
+            if is_missing(e):
+                return None
+            raise
+        return head['ContentLength']
+
+    def list_objects(self, prefix: str) -> List[Tuple[str, int, float]]:
+        start = self.object_key(prefix.strip('/') + '/' if prefix else '')
+        files = []
+        for page in self.client.get_paginator('list_objects_v2').paginate(
+                Bucket=self.bucket, Prefix=start, Delimiter='/'):
+            for item in page.get('Contents', []):
+                name = item['Key'][len(start):]
+                if name and not name.startswith('.'):
+                    files.append((name, item['Size'], item['LastModified'].timestamp()))
+        return files
+
+    async def scan(self, prefix: str = '') -> List[Tuple[str, int, float]]:
+        return await asyncio.to_thread(self.list_objects, prefix)
+
+    async def delete(self, keys: Iterable[str]):
+        keys = list(keys)
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            batch = keys[start:start + DELETE_BATCH_SIZE]
+            await asyncio.to_thread(
+                self.client.delete_objects, Bucket=self.bucket,
+                Delete={'Objects': [{'Key': self.object_key(key)} for key in batch], 'Quiet': True},
+            )
+        # Drop the local working copies too
+        await asyncio.to_thread(remove_files, [self.directory / key for key in keys])
+
+    def presign_put(self, key: str, content_type: str, expires_in: int = PRESIGN_EXPIRES) -> dict:
+        url = self.client.generate_presigned_url(
+            'put_object',
+            Params={'Bucket': self.bucket, 'Key': self.object_key(key), 'ContentType': content_type,
+                    'CacheControl': IMMUTABLE},
+            ExpiresIn=expires_in,
+        )
+        return {'method': 'PUT', 'url': url, 'headers': {'Content-Type': content_type, 'Cache-Control': IMMUTABLE}}
+
+    @property
+    def redirect_cache_control(self) -> str:
+        """How long a redirect to presign_get() may be cached."""
+        if self.public_base:
+            return IMMUTABLE
+        return f'private, max-age={PRESIGN_EXPIRES // 2}'
+
+    def presign_get(self, key: str, expires_in: int = PRESIGN_EXPIRES) -> str:
+        if self.public_base:
+            return f'{self.public_base}/{self.object_key(key)}'
+        return self.client.generate_presigned_url(
+            'get_object', Params={'Bucket': self.bucket, 'Key': self.object_key(key)}, ExpiresIn=expires_in)
+
+
+def content_type(key: str) -> str:
+    return guess_type(key)[0] or 'application/octet-stream'
+
+
+def is_missing(error: Exception) -> bool:
+    response = getattr(error, 'response', None) or {}
+    return str(response.get('Error', {}).get('Code')) in ('404', 'NoSuchKey', 'NotFound')
+
+
+def storage_from_env(directory: Path, secret: str):
+    backend = os.environ.get('STORAGE_BACKEND', 'local')
+    if backend == 'local':
+        return LocalStorage(directory, secret)
+    if backend == 's3':
+        options = {
+            'endpoint_url': os.environ.get('S3_ENDPOINT_URL'),
+            'region_name': os.environ.get('S3_REGION'),
+            'aws_access_key_id': os.environ.get('S3_ACCESS_KEY_ID'),
+            'aws_secret_access_key': os.environ.get('S3_SECRET_ACCESS_KEY'),
+        }
+        return S3Storage(
+            directory,
+            bucket=os.environ['S3_BUCKET'],
+            prefix=os.environ.get('S3_PREFIX', ''),
+            public_url=os.environ.get('S3_PUBLIC_URL'),
+            **{name: value for name, value in options.items() if value},
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+def upload_keys(filename: str, variants: Optional[dict]) -> List[str]:
+    """The keys an upload is stored under: the file and its variants."""
+    keys = [filename]
+    for fmt, widths in (variants or {}).items():
+        if fmt == 'auto':
+            continue
+        keys.extend(url.split(UPLOAD_URL_PREFIX, 1)[1] for url in widths.values())
+    return keys
+
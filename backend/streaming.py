@@ -0,0 +1,57 @@
+from typing import AsyncIterator, Callable, Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+NDJSON = 'application/x-ndjson'
+STREAM_BATCH_SIZE = 200
+
+
+def stream_format(request: Request, stream: bool) -> Optional[str]:
+    """'ndjson' or 'json' when the list should be streamed, None otherwise."""
+    if NDJSON in request.headers.get('accept', ''):
+        return 'ndjson'
+    return 'json' if stream else None
+
+
+async def iter_json_array(cursor, serialize: Callable[[dict], bytes]) -> AsyncIterator[bytes]:
+    """
+    Encode a Motor cursor as one JSON array, flushing once per batch so the
+    client gets the first documents while later ones are still being read.
+    """
+    chunk = [b'[']
+    first = True
+    count = 0
+    async for doc in cursor:
+        if not first:
+            chunk.append(b',')
+        chunk.append(serialize(doc))
+        first = False
+        count += 1
+        if count % STREAM_BATCH_SIZE == 0:
+            yield b''.join(chunk)
+            chunk = []
+    chunk.append(b']')
+    yield b''.join(chunk)
+
+
+async def iter_ndjson(cursor, serialize: Callable[[dict], bytes]) -> AsyncIterator[bytes]:
+    chunk = []
+    async for doc in cursor:
+        chunk.append(serialize(doc))
+        chunk.append(b'\n')
+        if len(chunk) >= 2 * STREAM_BATCH_SIZE:
+            yield b''.join(chunk)
+            chunk = []
+    if chunk:
+        yield b''.join(chunk)
+
+
+def stream_documents(fmt: str, cursor, serialize: Callable[[dict], bytes],
+                     headers=None) -> StreamingResponse:
+    cursor = cursor.batch_size(STREAM_BATCH_SIZE)
+    headers = {k: v for k, v in (headers or {}).items() if k != 'content-length'}
+    headers['Vary'] = 'Accept'
+    if fmt == 'ndjson':
+        return StreamingResponse(iter_ndjson(cursor, serialize), media_type=NDJSON, headers=headers)
+    return StreamingResponse(iter_json_array(cursor, serialize), media_type='application/json', headers=headers)
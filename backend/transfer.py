@@ -0,0 +1,101 @@
+"""
+Bulk import of content documents.
+
+An import is a stream of records, either NDJSON (one document per line,
+read as it arrives) or a JSON array, in the format GET /api/admin/export
+writes. Records are validated against the collection's model a batch at a
+time and written with one bulk_write of upserts keyed on `id` per batch, so
+importing an export into another environment replaces the documents it
+contains and leaves the others alone.
+"""
+from functools import lru_cache
+from typing import AsyncIterator, List, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pydantic_core import from_json, to_json
+from pymongo import ReplaceOne
+
+IMPORT_BATCH_SIZE = 500
+MAX_IMPORT_LINE_BYTES = 1024 * 1024
+REPORT_ERRORS = 100
+
+
+class ImportLineTooLong(Exception):
+    def __init__(self, record: int):
+        super().__init__(f"Line {record} is over {MAX_IMPORT_LINE_BYTES} bytes")
+        self.record = record
+
+
+async def ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """(line number, line) for every non-blank line of an NDJSON body."""
+    buffer = b''
+    number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        if len(buffer) > MAX_IMPORT_LINE_BYTES:
+            raise ImportLineTooLong(number + len(lines) + 1)
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, line
+    if buffer.strip():
+        yield number + 1, buffer
+
+
+def json_records(body: bytes) -> AsyncIterator[Tuple[int, bytes]]:
+    """(position, item) for every item of a JSON array body; ValueError when it isn't one."""
+    items = from_json(body)
+    if not isinstance(items, list):
+        raise ValueError("Expected a JSON array")
+
+    async def records():
+        for position, item in enumerate(items, 1):
+            yield position, to_json(item)
+
+    return records()
+
+
+async def batched(records: AsyncIterator[Tuple[int, bytes]],
+                  size: int = IMPORT_BATCH_SIZE) -> AsyncIterator[List[Tuple[int, bytes]]]:
+    batch = []
+    async for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@lru_cache(maxsize=None)
+def list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def validate_batch(model: Type[BaseModel], batch: List[Tuple[int, bytes]]) -> Tuple[list, list]:
+    """
+    Split a batch into ([(record, model instance)], [(record, error)]). The
+    whole batch is parsed in one call; only a batch with an invalid record
+    is gone through record by record to find it.
+    """
+    try:
+        items = list_adapter(model).validate_json(b'[' + b','.join(raw for _, raw in batch) + b']')
+        # A line like `{...},{...}` would join into two items
+        if len(items) == len(batch):
+            return [(record, item) for (record, _), item in zip(batch, items)], []
+    except ValidationError:
+        pass
+    valid, invalid = [], []
+    for record, raw in batch:
+        try:
+            valid.append((record, model.model_validate_json(raw)))
+        except ValidationError as e:
+            error = e.errors()[0]
+            location = '.'.join(str(part) for part in error['loc'])
+            invalid.append((record, f"{location}: {error['msg']}" if location else error['msg']))
+    return valid, invalid
+
+
+def upserts(docs: List[dict]) -> List[ReplaceOne]:
+    return [ReplaceOne({'id': doc['id']}, doc, upsert=True) for doc in docs]
@@ -0,0 +1,200 @@
+"""
+Garbage collection of orphaned uploads.
+
+Mark: every /api/uploads URL referenced from projects, albums, media and the
+profile is collected by streaming the collections with narrow projections,
+so memory grows with the number of referenced files, not documents.
+
+Sweep: stored files (in UPLOAD_DIR or the bucket, see storage.py) that
+weren't marked and are older than the grace period are deleted together with
+their .gz/.br siblings, their variants and their blob record. The grace
+period protects files that were just uploaded and aren't attached to a
+document yet; it counts from the file's mtime and from the blob's
+uploadedAt, which a repeated upload of the same content refreshes. A file
+whose blob record still lists references is kept, which covers documents
+written while the job runs.
+
+With dry_run the job only reports what it would delete.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Set
+
+from images import VARIANTS_DIR
+from uploads import REFERENCE_FIELDS, referenced_uploads, upload_filename
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_GC_GRACE = float(os.environ.get('UPLOAD_GC_GRACE', str(24 * 3600)))
+UPLOAD_GC_INTERVAL = float(os.environ.get('UPLOAD_GC_INTERVAL', '0'))  # seconds, 0 = manual only
+MARK_BATCH_SIZE = 1000
+SWEEP_BATCH_SIZE = 500
+REPORT_FILES = 100
+SIBLING_SUFFIXES = ('.gz', '.br')
+
+
+def uploads_in(value) -> Set[str]:
+    """Upload file names in any string nested inside `value`."""
+    if isinstance(value, str):
+        name = upload_filename(value)
+        return {name} if name else set()
+    if isinstance(value, dict):
+        value = value.values()
+    elif not isinstance(value, list):
+        return set()
+    names = set()
+    for item in value:
+        names |= uploads_in(item)
+    return names
+
+
+def sibling_base(name: str) -> Optional[str]:
+    """The file a precompressed sibling belongs to ("x.svg" for "x.svg.gz")."""
+    for suffix in SIBLING_SUFFIXES:
+        if name.endswith(suffix):
+            base = name[:-len(suffix)]
+            if Path(base).suffix:
+                return base
+    return None
+
+
+class UploadCollector:
+    def __init__(self, storage, grace: float = UPLOAD_GC_GRACE):
+        self.storage = storage
+        self.grace = grace
+        self.status: dict = {'state': 'idle'}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def mark(self, db) -> Set[str]:
+        marked = set()
+        self.status['documentsScanned'] = 0
+        for collection, fields in REFERENCE_FIELDS.items():
+            projection = {'_id': 0, **{field: 1 for field in fields}}
+            async for doc in db[collection].find({}, projection, batch_size=MARK_BATCH_SIZE):
+                marked |= referenced_uploads(collection, doc)
+                self.status['documentsScanned'] += 1
+        # The profile has no declared upload fields, so look through all of it
+        async for doc in db.profile.find({}, {'_id': 0}):
+            marked |= uploads_in(doc)
+            self.status['documentsScanned'] += 1
+        return marked
+
+    async def run(self, db, dry_run: bool = True, grace: Optional[float] = None) -> dict:
+        grace = self.grace if grace is None else grace
+        started = time.perf_counter()
+        report = self.status = {
+            'state': 'marking',
+            'dryRun': dry_run,
+            'graceSeconds': grace,
+            'startedAt': datetime.utcnow().isoformat(),
+        }
+        try:
+            marked = await self.mark(db)
+            report.update(state='sweeping', referencedFiles=len(marked))
+            await self.sweep(db, marked, time.time() - grace, dry_run, report)
+            report['state'] = 'done'
+        except Exception as e:
+            logger.error(f"Upload garbage collection failed: {e}")
+            report.update(state='failed', error=str(e))
+        report['finishedAt'] = datetime.utcnow().isoformat()
+        report['seconds'] = round(time.perf_counter() - started, 3)
+        logger.info(
+            f"Upload GC {'(dry run) ' if dry_run else ''}{report['state']}: "
+            f"{report.get('deletedFiles', 0)} files, {report.get('reclaimedBytes', 0)} bytes"
+        )
+        return report
+
+    async def sweep(self, db, marked: Set[str], cutoff: float, dry_run: bool, report: dict):
+        files = await self.storage.scan()
+        sizes = {name: size for name, size, _ in files}
+        # Siblings go with the file they belong to; orphaned ones on their own
+        candidates = [
+            (name, size) for name, size, mtime in files
+            if mtime < cutoff and name not in marked
+            and (sibling_base(name) is None or sibling_base(name) not in sizes)
+        ]
+        report.update(scannedFiles=len(files), candidates=0, deletedFiles=0, reclaimedBytes=0, files=[])
+
+        # Uploading content that is already stored doesn't always refresh the
+        # file's mtime (a deduplicated presign, or a bucket object), but it
+        # always refreshes the blob's uploadedAt
+        uploaded_before = datetime.utcfromtimestamp(cutoff).isoformat()
+        deleted = set()
+        for start in range(0, len(candidates), SWEEP_BATCH_SIZE):
+            batch = dict(candidates[start:start + SWEEP_BATCH_SIZE])
+            # Referenced by a document written since the mark phase started, or uploaded again
+            in_use = {'id': {'$in': list(batch)},
+                      '$or': [{'refs.0': {'$exists': True}}, {'uploadedAt': {'$gte': uploaded_before}}]}
+            for blob in await db.blobs.find(in_use, {'_id': 0, 'id': 1}).to_list(None):
+                batch.pop(blob['id'], None)
+            if not dry_run:
+                for name in list(batch):
+                    if not await self.release(db, name, uploaded_before):
+                        batch.pop(name)
+            keys = []
+            for name, size in batch.items():
+                keys.append(name)
+                for suffix in SIBLING_SUFFIXES:
+                    if name + suffix in sizes:
+                        keys.append(name + suffix)
+                        size += sizes[name + suffix]
+                report['candidates'] += 1
+                report['reclaimedBytes'] += size
+                if len(report['files']) < REPORT_FILES:
+                    report['files'].append(name)
+                deleted.add(name)
+            if not dry_run and batch:
+                await self.storage.delete(keys)
+                report['deletedFiles'] += len(batch)
+
+        # Variants of deleted files, and of originals that are gone already.
+        # The same content may be stored under two suffixes, sharing variants.
+        live_stems = {Path(name).stem for name in sizes if name not in deleted}
+        deleted_stems = {Path(name).stem for name in deleted} - live_stems
+        variants = await self.storage.scan(VARIANTS_DIR)
+        stale = [
+            (name, size) for name, size, mtime in variants
+            if name.rsplit('-', 1)[0] in deleted_stems
+            or (mtime < cutoff and name.rsplit('-', 1)[0] not in live_stems)
+        ]
+        report['variantFiles'] = len(stale)
+        report['reclaimedBytes'] += sum(size for _, size in stale)
+        if not dry_run and stale:
+            await self.storage.delete(f'{VARIANTS_DIR}/{name}' for name, _ in stale)
+
+    @staticmethod
+    async def release(db, name: str, uploaded_before: str) -> bool:
+        """
+        Delete the blob record of `name` if it is still unused; False when
+        the file has to stay. The check and the delete are one call, so a
+        reference added since the batch was read keeps the record and the file.
+        """
+        unused = {'id': name, 'refs.0': {'$exists': False}, 'uploadedAt': {'$not': {'$gte': uploaded_before}}}
+        if await db.blobs.find_one_and_delete(unused, {'_id': 0, 'id': 1}):
+            return True
+        # No record at all: a file the index never tracked
+        return await db.blobs.find_one({'id': name}, {'_id': 0, 'id': 1}) is None
+
+    def start(self, db, dry_run: bool = True, grace: Optional[float] = None) -> bool:
+        """Run in the background; False when a run is already in progress."""
+        if self.running:
+            return False
+        grace = self.grace if grace is None else grace
+        self.status = {'state': 'starting', 'dryRun': dry_run, 'graceSeconds': grace}
+        self._task = asyncio.create_task(self.run(db, dry_run, grace))
+        return True
+
+    async def run_periodically(self, db, interval: float = UPLOAD_GC_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            if not self.running:
+                self._task = asyncio.create_task(self.run(db, dry_run=False))
+                await self._task
@@ -0,0 +1,436 @@
+"""
+Upload storage helpers.
+
+Uploaded files are copied in chunks on a worker thread, so a large photo
+never blocks the event loop. The copy enforces the size limit as it goes,
+hashes the bytes on the way through and lands in a temporary file that is
+renamed into place only once it is complete.
+
+Files are content addressed: the name is the SHA-256 of the bytes, so the
+same image uploaded as an album cover, a project image and a gallery entry
+is stored once. The `blobs` collection records, per file, which documents
+reference it ("projects:<id>", "albums:<id>", "media:<id>").
+
+Large files can also be sent in pieces through a resumable upload session
+(see UploadSessions), which ends in the same content-addressed file.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Dict, Iterable, NamedTuple, Optional, Set
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', str(50 * 1024 * 1024)))
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class UploadOffsetMismatch(Exception):
+    def __init__(self, offset: int):
+        super().__init__(f"Upload is at offset {offset}")
+        self.offset = offset
+
+
+class UploadIncomplete(Exception):
+    pass
+
+
+class StoredUpload(NamedTuple):
+    filename: str
+    size: int
+    sha256: str
+    seconds: float
+    deduplicated: bool
+
+
+class UploadMetrics:
+    def __init__(self):
+        self.uploads = 0
+        self.rejected = 0
+        self.deduplicated = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.last_bytes_per_second = 0.0
+
+    def record(self, stored: StoredUpload):
+        self.uploads += 1
+        self.deduplicated += stored.deduplicated
+        self.bytes += stored.size
+        self.seconds += stored.seconds
+        self.last_bytes_per_second = stored.size / stored.seconds if stored.seconds else 0.0
+
+    def stats(self) -> dict:
+        return {
+            'uploads': self.uploads,
+            'rejected': self.rejected,
+            'deduplicated': self.deduplicated,
+            'bytes': self.bytes,
+            'averageBytesPerSecond': round(self.bytes / self.seconds, 1) if self.seconds else 0.0,
+            'lastBytesPerSecond': round(self.last_bytes_per_second, 1),
+        }
+
+
+upload_metrics = UploadMetrics()
+
+
+def copy_stream(source: BinaryIO, target: Path, max_bytes: int) -> tuple:
+    """Copy `source` to `target` in chunks; return (size, sha256 hex digest)."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(target, 'wb') as out:
+        while True:
+            chunk = source.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"File exceeds {max_bytes} bytes")
+            digest.update(chunk)
+            out.write(chunk)
+    return size, digest.hexdigest()
+
+
+# Text-like uploads get a .gz sibling that the uploads mount serves to gzip clients
+COMPRESSIBLE_SUFFIXES = {'.svg', '.txt', '.csv', '.json', '.xml'}
+
+
+def write_compressed_sibling(path: Path):
+    if path.suffix.lower() not in COMPRESSIBLE_SUFFIXES:
+        return
+    compressed = gzip.compress(path.read_bytes(), 9)
+    if len(compressed) < path.stat().st_size:
+        tmp = path.with_name(f".{path.name}.gz.tmp")
+        tmp.write_bytes(compressed)
+        os.replace(tmp, path.with_name(path.name + '.gz'))
+
+
+async def receive_stream(chunks: AsyncIterator[bytes], target: Path, max_bytes: int) -> tuple:
+    """copy_stream for a request body: write `chunks` to `target`; return (size, sha256 hex digest)."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(target, 'wb') as out:
+        buffer = bytearray()
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"File exceeds {max_bytes} bytes")
+            digest.update(chunk)
+            buffer += chunk
+            if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                await asyncio.to_thread(out.write, buffer)
+                buffer = bytearray()
+        if buffer:
+            await asyncio.to_thread(out.write, buffer)
+    return size, digest.hexdigest()
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Other spellings of a type's suffix, so the same bytes get one name
+CANONICAL_SUFFIXES = {
+    '.jpeg': '.jpg',
+    '.jpe': '.jpg',
+    '.jfif': '.jpg',
+    '.tiff': '.tif',
+    '.htm': '.html',
+    '.yml': '.yaml',
+}
+
+
+def upload_name(sha256: str, suffix: str) -> str:
+    """The content address of an upload: its SHA-256 plus the canonical suffix."""
+    suffix = suffix.lower()
+    return f"{sha256}{CANONICAL_SUFFIXES.get(suffix, suffix)}"
+
+
+def place_upload(tmp: Path, directory: Path, sha256: str, suffix: str) -> tuple:
+    """Move a complete temporary file to its content address; return (filename, deduplicated)."""
+    filename = upload_name(sha256, suffix)
+    target = directory / filename
+    deduplicated = target.exists()
+    if deduplicated:
+        # Restart the garbage collector's grace period for the re-uploaded file
+        os.utime(target)
+    else:
+        os.replace(tmp, target)
+    return filename, deduplicated
+
+
+async def store_upload(source: BinaryIO, directory: Path, suffix: str,
+                       max_bytes: int = MAX_UPLOAD_BYTES) -> StoredUpload:
+    """Stream `source` into `directory`, named by upload_name()."""
+    tmp = directory / f".{os.urandom(8).hex()}.part"
+    started = time.perf_counter()
+    try:
+        size, sha256 = await asyncio.to_thread(copy_stream, source, tmp, max_bytes)
+        filename, deduplicated = place_upload(tmp, directory, sha256, suffix)
+        if not deduplicated:
+            await asyncio.to_thread(write_compressed_sibling, directory / filename)
+    except UploadTooLarge:
+        upload_metrics.rejected += 1
+        raise
+    finally:
+        tmp.unlink(missing_ok=True)
+    stored = StoredUpload(filename, size, sha256, time.perf_counter() - started, deduplicated)
+    upload_metrics.record(stored)
+    logger.info(f"Stored upload {filename}: {size} bytes in {stored.seconds:.3f}s"
+                f"{' (already stored)' if deduplicated else ''}")
+    return stored
+
+
+# ==================== RESUMABLE SESSIONS ====================
+
+UPLOAD_SESSION_TTL = int(os.environ.get('UPLOAD_SESSION_TTL', str(24 * 3600)))
+SESSIONS_DIR = '.sessions'
+SESSION_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class UploadSessions:
+    """
+    Resumable uploads: a session is created with the file's name and size,
+    the bytes arrive in any number of appends at the current offset, and
+    finalizing moves the file to its content address like store_upload.
+
+    Each session is a `<id>.json` description and a `<id>.part` file under
+    `<uploads>/.sessions`. The offset is the size of the part file, so it is
+    exactly what reached the disk and survives a restart. A session expires
+    UPLOAD_SESSION_TTL seconds after its last append.
+    """
+
+    def __init__(self, upload_dir: Path, ttl: int = UPLOAD_SESSION_TTL):
+        self.upload_dir = upload_dir
+        self.directory = upload_dir / SESSIONS_DIR
+        self.ttl = ttl
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def paths(self, session_id: str) -> tuple:
+        return self.directory / f"{session_id}.json", self.directory / f"{session_id}.part"
+
+    def describe(self, meta: dict, part: Path) -> dict:
+        stat = part.stat()
+        return {
+            **meta,
+            'offset': stat.st_size,
+            'expiresAt': datetime.utcfromtimestamp(stat.st_mtime + self.ttl).isoformat(),
+        }
+
+    def create(self, filename: str, size: int) -> dict:
+        self.directory.mkdir(exist_ok=True)
+        session_id = os.urandom(16).hex()
+        meta = {
+            'id': session_id,
+            'filename': Path(filename).name,
+            'size': size,
+            'createdAt': datetime.utcnow().isoformat(),
+        }
+        meta_path, part = self.paths(session_id)
+        part.touch()
+        meta_path.write_text(json.dumps(meta))
+        return self.describe(meta, part)
+
+    def get(self, session_id: str) -> Optional[dict]:
+        """The session with its current offset, or None when unknown or expired."""
+        if not SESSION_ID.match(session_id):
+            return None
+        meta_path, part = self.paths(session_id)
+        try:
+            meta = json.loads(meta_path.read_text())
+            if part.stat().st_mtime + self.ttl < time.time():
+                self.delete(session_id)
+                return None
+        except (FileNotFoundError, ValueError):
+            return None
+        return self.describe(meta, part)
+
+    def delete(self, session_id: str):
+        for path in self.paths(session_id):
+            path.unlink(missing_ok=True)
+        self._locks.pop(session_id, None)
+
+    def sweep(self) -> int:
+        """Delete expired sessions; return how many were removed."""
+        if not self.directory.exists():
+            return 0
+        removed = 0
+        for meta_path in self.directory.glob('*.json'):
+            session_id = meta_path.stem
+            _, part = self.paths(session_id)
+            try:
+                expired = part.stat().st_mtime + self.ttl < time.time()
+            except FileNotFoundError:
+                expired = True
+            if expired:
+                self.delete(session_id)
+                removed += 1
+        if removed:
+            logger.info(f"Removed {removed} expired upload sessions")
+        return removed
+
+    async def append(self, session_id: str, offset: int, chunks: AsyncIterator[bytes]) -> Optional[dict]:
+        """
+        Write `chunks` at `offset`, which has to be the session's current
+        offset. Bytes that arrive before the client disconnects are kept, so
+        the next append resumes from there.
+        """
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        async with lock:
+            session = self.get(session_id)
+            if session is None:
+                return None
+            if offset != session['offset']:
+                raise UploadOffsetMismatch(session['offset'])
+            remaining = session['size'] - offset
+            _, part = self.paths(session_id)
+            with open(part, 'ab') as out:
+                buffer = bytearray()
+                try:
+                    async for chunk in chunks:
+                        remaining -= len(chunk)
+                        if remaining < 0:
+                            raise UploadTooLarge(f"Session {session_id} is {session['size']} bytes")
+                        buffer += chunk
+                        if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                            await asyncio.to_thread(out.write, buffer)
+                            buffer = bytearray()
+                finally:
+                    if buffer:
+                        await asyncio.to_thread(out.write, buffer)
+            return self.get(session_id)
+
+    async def finalize(self, session_id: str) -> Optional[StoredUpload]:
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        async with lock:
+            session = self.get(session_id)
+            if session is None:
+                return None
+            if session['offset'] != session['size']:
+                raise UploadIncomplete(f"Received {session['offset']} of {session['size']} bytes")
+            _, part = self.paths(session_id)
+            started = time.perf_counter()
+            sha256 = await asyncio.to_thread(hash_file, part)
+            filename, deduplicated = place_upload(part, self.upload_dir, sha256, Path(session['filename']).suffix)
+            self.delete(session_id)
+        if not deduplicated:
+            await asyncio.to_thread(write_compressed_sibling, self.upload_dir / filename)
+        stored = StoredUpload(filename, session['size'], sha256, time.perf_counter() - started, deduplicated)
+        upload_metrics.record(stored)
+        logger.info(f"Stored resumable upload {filename}: {stored.size} bytes")
+        return stored
+
+
+# ==================== REFERENCES ====================
+
+UPLOAD_URL_PREFIX = '/api/uploads/'
+# Name of a content-addressed upload: SHA-256 plus its suffix (see upload_name)
+UPLOAD_KEY = re.compile(r'^[0-9a-f]{64}(\.[A-Za-z0-9]+)?$')
+
+# Fields of each collection that may hold an upload URL
+REFERENCE_FIELDS = {
+    'projects': ('image', 'gallery'),
+    'albums': ('cover',),
+    'media': ('url',),
+}
+
+
+def upload_filename(url: str) -> Optional[str]:
+    """The stored file name behind an /api/uploads URL, absolute or relative."""
+    if not isinstance(url, str) or UPLOAD_URL_PREFIX not in url:
+        return None
+    name = url.split(UPLOAD_URL_PREFIX, 1)[1].split('?', 1)[0].split('#', 1)[0]
+    return name if name and '/' not in name else None
+
+
+def referenced_uploads(collection: str, doc: Optional[dict]) -> Set[str]:
+    names = set()
+    if not doc:
+        return names
+    for field in REFERENCE_FIELDS[collection]:
+        value = doc.get(field)
+        for url in value if isinstance(value, list) else [value]:
+            name = upload_filename(url)
+            if name:
+                names.add(name)
+    return names
+
+
+def reference_projection(collection: str) -> dict:
+    return {'_id': 0, **{field: 1 for field in REFERENCE_FIELDS[collection]}}
+
+
+async def register_blob(db, stored: StoredUpload):
+    now = datetime.utcnow().isoformat()
+    await db.blobs.update_one(
+        {'id': stored.filename},
+        {
+            '$setOnInsert': {
+                'id': stored.filename,
+                'sha256': stored.sha256,
+                'size': stored.size,
+                'refs': [],
+                'createdAt': now,
+            },
+            # A repeated upload counts as new for the cleanup grace period
+            '$set': {'uploadedAt': now},
+        },
+        upsert=True,
+    )
+
+
+async def update_references(db, collection: str, doc_id: str, old: Optional[dict], new: Optional[dict]):
+    """Point the blob index from the uploads `old` used to the ones `new` uses."""
+    ref = f"{collection}:{doc_id}"
+    before = referenced_uploads(collection, old)
+    after = referenced_uploads(collection, new)
+    if before - after:
+        await db.blobs.update_many({'id': {'$in': sorted(before - after)}}, {'$pull': {'refs': ref}})
+    for name in sorted(after - before):
+        # Upsert, so files stored before the index existed get tracked too
+        await db.blobs.update_one(
+            {'id': name},
+            {'$addToSet': {'refs': ref}, '$setOnInsert': {'createdAt': datetime.utcnow().isoformat()}},
+            upsert=True,
+        )
+
+
+async def add_references(db, collection: str, docs: Iterable[dict]):
+    """update_references for many new documents, in one bulk write."""
+    operations = [
+        UpdateOne(
+            {'id': name},
+            {'$addToSet': {'refs': f"{collection}:{doc['id']}"},
+             '$setOnInsert': {'createdAt': datetime.utcnow().isoformat()}},
+            upsert=True,
+        )
+        for doc in docs
+        for name in sorted(referenced_uploads(collection, doc))
+    ]
+    if operations:
+        await db.blobs.bulk_write(operations, ordered=False)
+
+
+async def drop_references(db, collection: str, doc_ids: Iterable[str]):
+    refs = [f"{collection}:{doc_id}" for doc_id in doc_ids]
+    if refs:
+        await db.blobs.update_many({'refs': {'$in': refs}}, {'$pull': {'refs': {'$in': refs}}})
@@ -5,6 +5,7 @@ import { Badge } from '../ui/badge';
 import { Button } from '../ui/button';
 import { useAuth } from '../../context/AuthContext';
 import { useLanguage } from '../../context/LanguageContext';
+import { srcSet } from '../../lib/utils';
 
 // Helper to check if item is new (added within last 7 days)
 const isNew = (dateString) => {
@@ -45,6 +46,8 @@ const ProjectCard = ({ project, onEdit, onDelete }) => {
         <div className={`absolute inset-0 bg-zinc-800 ${imageLoaded ? 'hidden' : 'animate-pulse'}`} />
         <img
           src={project.image}
+          srcSet={srcSet(project.variants, project.image)}
+          sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
           alt={project.title}
           className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-500"
           onLoad={() => setImageLoaded(true)}
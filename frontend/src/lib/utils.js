@@ -4,3 +4,23 @@ import { twMerge } from "tailwind-merge"
 export function cn(...inputs) {
   return twMerge(clsx(inputs));
 }
+
+// srcset for an upload from the `variants` map the API returns with each
+// project, album and image. "auto" URLs negotiate AVIF/WebP on the server.
+export function srcSet(variants, url) {
+  const widths = variants?.[url]?.auto;
+  if (!widths) return undefined;
+  return Object.entries(widths)
+    .map(([width, src]) => `${src} ${width}w`)
+    .join(', ');
+}
+
+// Background shown while an image loads: its dominant color with the blurred
+// placeholder from the API on top.
+export function placeholderStyle(info) {
+  if (!info?.color) return undefined;
+  return {
+    backgroundColor: info.color,
+    backgroundImage: info.placeholder ? `url(${info.placeholder})` : undefined,
+  };
+}
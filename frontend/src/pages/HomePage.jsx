@@ -4,24 +4,28 @@ import { ArrowRight, Cpu, Code, Zap, ChevronDown } from 'lucide-react';
 import { Button } from '../components/ui/button';
 import { profileData } from '../data/mockData';
 import { useLanguage } from '../context/LanguageContext';
-import { projectsAPI, reviewsAPI } from '../services/api';
+import { homeAPI } from '../services/api';
 import ProjectCard from '../components/projects/ProjectCard';
 import ReviewCard from '../components/reviews/ReviewCard';
 
 const HomePage = () => {
   const { t } = useLanguage();
-  const [projects, setProjects] = useState([]);
-  const [reviews, setReviews] = useState([]);
+  const [profile, setProfile] = useState(profileData);
+  const [featuredProjects, setFeaturedProjects] = useState([]);
+  const [latestReviews, setLatestReviews] = useState([]);
+  const [projectCount, setProjectCount] = useState(0);
+  const [reviewCount, setReviewCount] = useState(0);
 
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [projectsData, reviewsData] = await Promise.all([
-          projectsAPI.getAll(),
-          reviewsAPI.getAll()
-        ]);
-        setProjects(projectsData);
-        setReviews(reviewsData);
+        // One request returns everything the landing page renders
+        const data = await homeAPI.get();
+        setProfile({ ...profileData, ...data.profile });
+        setFeaturedProjects(data.featuredProjects);
+        setLatestReviews(data.latestReviews);
+        setProjectCount(data.projectCount);
+        setReviewCount(data.reviewCount);
       } catch (error) {
         console.error('Error fetching data:', error);
       }
@@ -29,9 +33,6 @@ const HomePage = () => {
     fetchData();
   }, []);
 
-  const featuredProjects = projects.filter(p => p.featured).slice(0, 2);
-  const latestReviews = reviews.slice(0, 3);
-
   const scrollToContent = () => {
     document.getElementById('about-section')?.scrollIntoView({ behavior: 'smooth' });
   };
@@ -56,7 +57,7 @@ const HomePage = () => {
           {/* Main Title */}
           <h1 className="text-5xl md:text-7xl lg:text-8xl font-bold text-white mb-6">
             {t('home.greeting')}{' '}
-            <span className="text-red-500">{profileData.shortName}</span>
+            <span className="text-red-500">{profile.shortName}</span>
           </h1>
 
           {/* Subtitle */}
@@ -64,7 +65,7 @@ const HomePage = () => {
             {t('home.title')}
           </p>
           <p className="text-lg text-gray-500 mb-12 max-w-xl mx-auto">
-            {profileData.faculty}
+            {profile.faculty}
           </p>
 
           {/* CTA Buttons */}
@@ -100,7 +101,7 @@ const HomePage = () => {
             <div>
               <span className="text-red-500 text-sm font-mono uppercase tracking-wider">{t('home.aboutMe')}</span>
               <h2 className="text-4xl md:text-5xl font-bold text-white mt-4 mb-6">
-                {profileData.name}
+                {profile.name}
               </h2>
               <p className="text-gray-400 text-lg leading-relaxed mb-6">
                 {t('home.bio')}
@@ -112,15 +113,15 @@ const HomePage = () => {
               {/* Stats */}
               <div className="grid grid-cols-3 gap-6">
                 <div className="text-center p-4 bg-white/5 rounded-xl border border-white/10">
-                  <span className="text-3xl font-bold text-red-500">{projects.length}+</span>
+                  <span className="text-3xl font-bold text-red-500">{projectCount}+</span>
                   <p className="text-gray-400 text-sm mt-1">{t('home.projects')}</p>
                 </div>
                 <div className="text-center p-4 bg-white/5 rounded-xl border border-white/10">
-                  <span className="text-3xl font-bold text-red-500">{profileData.age}</span>
+                  <span className="text-3xl font-bold text-red-500">{profile.age}</span>
                   <p className="text-gray-400 text-sm mt-1">{t('home.age')}</p>
                 </div>
                 <div className="text-center p-4 bg-white/5 rounded-xl border border-white/10">
-                  <span className="text-3xl font-bold text-red-500">{reviews.length}+</span>
+                  <span className="text-3xl font-bold text-red-500">{reviewCount}+</span>
                   <p className="text-gray-400 text-sm mt-1">{t('home.reviews')}</p>
                 </div>
               </div>
@@ -5,6 +5,7 @@ import { Button } from '../components/ui/button';
 import { useAuth } from '../context/AuthContext';
 import { useLanguage } from '../context/LanguageContext';
 import { albumsAPI, mediaAPI } from '../services/api';
+import { srcSet, placeholderStyle } from '../lib/utils';
 import MediaUploadModal from '../components/media/MediaUploadModal';
 import AlbumModal from '../components/media/AlbumModal';
 
@@ -33,16 +34,11 @@ const MediaPage = () => {
   const [albums, setAlbums] = useState([]);
   const [images, setImages] = useState([]);
 
-  // Fetch albums and images from API
+  // Fetch albums, with their image counts, from API
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [albumsData, imagesData] = await Promise.all([
-          albumsAPI.getAll(),
-          mediaAPI.getAll()
-        ]);
-        setAlbums(albumsData);
-        setImages(imagesData);
+        setAlbums(await albumsAPI.getAll(true));
       } catch (error) {
         console.error('Error fetching media data:', error);
       } finally {
@@ -52,6 +48,20 @@ const MediaPage = () => {
     fetchData();
   }, []);
 
+  // Fetch the open album's images page by page; the first page renders
+  // while the rest are still loading
+  useEffect(() => {
+    setImages([]);
+    if (!activeAlbumId) return undefined;
+    let cancelled = false;
+    mediaAPI.getAll(activeAlbumId, (loaded) => {
+      if (!cancelled) setImages(loaded);
+    }).catch((error) => console.error('Error fetching album images:', error));
+    return () => {
+      cancelled = true;
+    };
+  }, [activeAlbumId]);
+
   // Get images for active album
   const albumImages = activeAlbumId 
     ? images.filter(img => img.albumId === activeAlbumId)
@@ -71,8 +81,12 @@ const MediaPage = () => {
       category: album.description
     }));
 
-  // Update album counts
-  const getAlbumCount = (albumId) => images.filter(img => img.albumId === albumId).length;
+  // Album image counts, adjusted locally as images are added and deleted
+  const getAlbumCount = (albumId) => albums.find(a => a.id === albumId)?.imageCount || 0;
+
+  const adjustAlbumCount = (albumId, delta) => {
+    setAlbums(prev => prev.map(a => a.id === albumId ? { ...a, imageCount: (a.imageCount || 0) + delta } : a));
+  };
 
   // Auto-advance slideshow
   useEffect(() => {
@@ -87,7 +101,10 @@ const MediaPage = () => {
   const handleAddImage = async (imageData) => {
     try {
       const newImage = await mediaAPI.create(imageData);
-      setImages(prev => [newImage, ...prev]);
+      if (newImage.albumId === activeAlbumId) {
+        setImages(prev => [newImage, ...prev]);
+      }
+      adjustAlbumCount(newImage.albumId, 1);
       setUploadModalOpen(false);
     } catch (error) {
       console.error('Error adding image:', error);
@@ -99,7 +116,9 @@ const MediaPage = () => {
     if (window.confirm('Ștergi această imagine?')) {
       try {
         await mediaAPI.delete(id);
+        const deleted = images.find(img => img.id === id);
         setImages(prev => prev.filter(img => img.id !== id));
+        if (deleted) adjustAlbumCount(deleted.albumId, -1);
       } catch (error) {
         console.error('Error deleting image:', error);
       }
@@ -110,7 +129,7 @@ const MediaPage = () => {
     try {
       if (editingAlbum) {
         const updated = await albumsAPI.update(editingAlbum.id, albumData);
-        setAlbums(prev => prev.map(a => a.id === editingAlbum.id ? updated : a));
+        setAlbums(prev => prev.map(a => a.id === editingAlbum.id ? { ...a, ...updated } : a));
       } else {
         const newAlbum = await albumsAPI.create(albumData);
         setAlbums(prev => [newAlbum, ...prev]);
@@ -191,7 +210,7 @@ const MediaPage = () => {
                   {activeAlbum.name}
                 </h1>
                 <p className="text-gray-400">{activeAlbum.description}</p>
-                <p className="text-gray-500 text-sm mt-1">{albumImages.length} {t('media.images')}</p>
+                <p className="text-gray-500 text-sm mt-1">{getAlbumCount(activeAlbumId)} {t('media.images')}</p>
               </div>
 
               {isAdmin && (
@@ -223,11 +242,17 @@ const MediaPage = () => {
               {albumImages.map((image) => (
                 <div
                   key={image.id}
-                  className="group relative aspect-[4/3] bg-zinc-900 overflow-hidden cursor-pointer"
+                  className="group relative aspect-[4/3] bg-zinc-900 bg-cover bg-center overflow-hidden cursor-pointer"
+                  style={placeholderStyle(image)}
                   onClick={() => setSelectedImage(image)}
                 >
                   <img
                     src={image.url}
+                    srcSet={srcSet(image.variants, image.url)}
+                    width={image.width || undefined}
+                    height={image.height || undefined}
+                    sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
+                    loading="lazy"
                     alt={image.title}
                     className="w-full h-full object-cover transition-transform duration-500 group-hover:scale-105"
                   />
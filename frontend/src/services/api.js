@@ -31,6 +31,25 @@ api.interceptors.response.use(
   }
 );
 
+// Lists are served a page at a time; X-Next-Cursor points at the next one
+const PAGE_SIZE = 100;
+
+// Fetches every page of a list. `onPage`, if given, receives the items
+// loaded so far after each page, so the first ones can render right away.
+const getAllPages = async (url, params = {}, onPage = null) => {
+  const items = [];
+  let cursor = null;
+  do {
+    const response = await api.get(url, {
+      params: { ...params, limit: PAGE_SIZE, ...(cursor && { cursor }) },
+    });
+    items.push(...response.data);
+    if (onPage) onPage([...items]);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return items;
+};
+
 // ==================== AUTH ====================
 
 export const authAPI = {
@@ -57,13 +76,19 @@ export const authAPI = {
   },
 };
 
-// ==================== PROJECTS ====================
+// ==================== HOME ====================
 
-export const projectsAPI = {
-  getAll: async () => {
-    const response = await api.get('/projects');
+export const homeAPI = {
+  get: async () => {
+    const response = await api.get('/home');
     return response.data;
   },
+};
+
+// ==================== PROJECTS ====================
+
+export const projectsAPI = {
+  getAll: (onPage = null) => getAllPages('/projects', {}, onPage),
   
   getById: async (id) => {
     const response = await api.get(`/projects/${id}`);
@@ -89,8 +114,9 @@ export const projectsAPI = {
 // ==================== ALBUMS ====================
 
 export const albumsAPI = {
-  getAll: async () => {
-    const response = await api.get('/albums');
+  // With `withCounts`, each album carries its imageCount
+  getAll: async (withCounts = false) => {
+    const response = await api.get('/albums', { params: withCounts ? { withCounts } : {} });
     return response.data;
   },
   
@@ -113,16 +139,27 @@ export const albumsAPI = {
 // ==================== MEDIA ====================
 
 export const mediaAPI = {
-  getAll: async (albumId = null) => {
-    const url = albumId ? `/media?albumId=${albumId}` : '/media';
-    const response = await api.get(url);
-    return response.data;
-  },
+  getAll: (albumId = null, onPage = null) => getAllPages('/media', albumId ? { albumId } : {}, onPage),
   
   create: async (data) => {
     const response = await api.post('/media', data);
     return response.data;
   },
+
+  // Uploads many files into one album in a single request. `metadata` is an
+  // optional array of { title, category }, one per file.
+  bulkCreate: async (albumId, files, metadata = null) => {
+    const formData = new FormData();
+    formData.append('albumId', albumId);
+    files.forEach((file) => formData.append('files', file));
+    if (metadata) formData.append('metadata', JSON.stringify(metadata));
+    const response = await api.post('/media/bulk', formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+    return response.data;
+  },
   
   delete: async (id) => {
     const response = await api.delete(`/media/${id}`);
@@ -133,10 +170,7 @@ export const mediaAPI = {
 // ==================== REVIEWS ====================
 
 export const reviewsAPI = {
-  getAll: async () => {
-    const response = await api.get('/reviews');
-    return response.data;
-  },
+  getAll: (onPage = null) => getAllPages('/reviews', {}, onPage),
   
   create: async (data) => {
     const response = await api.post('/reviews', data);
@@ -157,10 +191,7 @@ export const reviewsAPI = {
 // ==================== CONTACT ====================
 
 export const contactAPI = {
-  getAll: async () => {
-    const response = await api.get('/contact');
-    return response.data;
-  },
+  getAll: (onPage = null) => getAllPages('/contact', {}, onPage),
   
   send: async (data) => {
     const response = await api.post('/contact', data);
@@ -194,8 +225,28 @@ export const profileAPI = {
 
 // ==================== FILE UPLOAD ====================
 
+// Files above this size go through a resumable upload session
+const RESUMABLE_THRESHOLD = 8 * 1024 * 1024;
+const CHUNK_SIZE = 4 * 1024 * 1024;
+const MAX_RETRIES = 5;
+// Send files straight to the media store through presigned URLs
+const DIRECT_UPLOADS = process.env.REACT_APP_DIRECT_UPLOADS === 'true';
+
+const sha256Hex = async (file) => {
+  const digest = await crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('');
+};
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
 export const uploadAPI = {
   upload: async (file) => {
+    if (DIRECT_UPLOADS) {
+      return uploadAPI.uploadDirect(file);
+    }
+    if (file.size > RESUMABLE_THRESHOLD) {
+      return uploadAPI.uploadResumable(file);
+    }
     const formData = new FormData();
     formData.append('file', file);
     
@@ -206,6 +257,60 @@ export const uploadAPI = {
     });
     return response.data;
   },
+
+  // Sends the file in chunks; after a dropped connection it asks the server
+  // for the offset that made it to disk and continues from there.
+  uploadResumable: async (file, onProgress) => {
+    const { data: session } = await api.post('/upload/sessions', {
+      filename: file.name,
+      size: file.size,
+    });
+    let offset = 0;
+    let retries = 0;
+    while (offset < file.size) {
+      try {
+        const { data } = await api.patch(
+          `/upload/sessions/${session.id}`,
+          file.slice(offset, offset + CHUNK_SIZE),
+          {
+            headers: {
+              'Content-Type': 'application/offset+octet-stream',
+              'Upload-Offset': String(offset),
+            },
+          }
+        );
+        offset = data.offset;
+        retries = 0;
+        if (onProgress) onProgress(offset / file.size);
+      } catch (error) {
+        if (error.response && error.response.status !== 409) throw error;
+        if (++retries > MAX_RETRIES) throw error;
+        await sleep(1000 * retries);
+        const { data } = await api.get(`/upload/sessions/${session.id}`);
+        offset = data.offset;
+      }
+    }
+    const response = await api.post(`/upload/sessions/${session.id}/finalize`);
+    return response.data;
+  },
+
+  // The API only signs the upload and checks the result; the bytes go
+  // directly to storage. Files the store already has aren't sent at all.
+  uploadDirect: async (file) => {
+    const { data } = await api.post('/upload/presign', {
+      filename: file.name,
+      contentType: file.type || 'application/octet-stream',
+      size: file.size,
+      sha256: await sha256Hex(file),
+    });
+    if (!data.upload) return data;
+    const { method, url, headers } = data.upload;
+    // Local storage signs a path on this API, S3 a full bucket URL
+    const target = url.startsWith('/') ? process.env.REACT_APP_BACKEND_URL + url : url;
+    await axios({ method, url: target, data: file, headers });
+    const response = await api.post('/upload/presign/complete', { key: data.key });
+    return response.data;
+  },
 };
 
 export default api;
@@ -0,0 +1,114 @@
+"""
+Response cache unit tests
+Tests for: LRU eviction, TTL expiry, tag invalidation, collection ETags
+"""
+import pytest
+
+import cache
+from cache import CollectionVersions, ResponseCache, etag_matches
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    return now
+
+
+class TestResponseCache:
+    """ResponseCache"""
+
+    def test_hit_and_miss(self):
+        responses = ResponseCache()
+        key = ResponseCache.key('projects', limit=10, cursor=None)
+        assert responses.get(key) is None
+        responses.set(key, ['p1'], tags=['projects'])
+        assert responses.get(key) == ['p1']
+        assert responses.stats()['hits'] == 1 and responses.stats()['misses'] == 1
+
+    def test_key_ignores_parameter_order(self):
+        assert ResponseCache.key('media', a=1, b=2) == ResponseCache.key('media', b=2, a=1)
+
+    def test_least_recently_used_is_evicted(self):
+        responses = ResponseCache(max_entries=2)
+        responses.set('a', 1, tags=['projects'])
+        responses.set('b', 2, tags=['projects'])
+        responses.get('a')
+        responses.set('c', 3, tags=['projects'])
+        assert responses.get('b') is None
+        assert responses.get('a') == 1 and responses.get('c') == 3
+        assert responses.stats()['evictions'] == 1 and responses.stats()['entries'] == 2
+
+    def test_entry_expires_after_ttl(self, clock):
+        responses = ResponseCache(ttl=60)
+        responses.set('a', 1, tags=['projects'])
+        clock[0] += 60
+        assert responses.get('a') == 1
+        clock[0] += 1
+        assert responses.get('a') is None
+        assert responses.stats()['entries'] == 0
+
+    def test_set_again_renews_ttl(self, clock):
+        responses = ResponseCache(ttl=60)
+        responses.set('a', 1, tags=['projects'])
+        clock[0] += 50
+        responses.set('a', 2, tags=['projects'])
+        clock[0] += 50
+        assert responses.get('a') == 2
+
+    def test_invalidate_drops_only_tagged_entries(self):
+        responses = ResponseCache()
+        responses.set('albums', 1, tags=['albums'])
+        responses.set('albums-with-counts', 2, tags=['albums', 'media'])
+        responses.set('projects', 3, tags=['projects'])
+        responses.invalidate('media')
+        assert responses.get('albums') == 1 and responses.get('projects') == 3
+        assert responses.get('albums-with-counts') is None
+
+    def test_clear(self):
+        responses = ResponseCache()
+        responses.set('a', 1, tags=['projects'])
+        responses.clear()
+        assert responses.get('a') is None
+
+
+class TestCollectionVersions:
+    """CollectionVersions / etag_matches"""
+
+    def test_etag_is_stable_without_writes(self):
+        versions = CollectionVersions()
+        assert versions.etag(['projects'], scope='list') == versions.etag(['projects'], scope='list')
+
+    def test_bump_changes_etag(self):
+        versions = CollectionVersions()
+        before = versions.etag(['albums', 'media'], scope='albums')
+        versions.bump('media')
+        after = versions.etag(['albums', 'media'], scope='albums')
+        assert after != before
+        assert versions.get('media') == 1 and versions.get('albums') == 0
+
+    def test_bump_of_other_collection_keeps_etag(self):
+        versions = CollectionVersions()
+        before = versions.etag(['projects'])
+        versions.bump('reviews')
+        assert versions.etag(['projects']) == before
+
+    def test_scope_and_restart_change_etag(self):
+        versions = CollectionVersions()
+        assert versions.etag(['media'], scope='a1') != versions.etag(['media'], scope='a2')
+        assert CollectionVersions().etag(['media']) != versions.etag(['media'])
+
+    def test_snapshot_detects_write_during_read(self):
+        versions = CollectionVersions()
+        snapshot = versions.snapshot(['albums', 'media'])
+        assert versions.snapshot(['albums', 'media']) == snapshot
+        versions.bump('albums')
+        assert versions.snapshot(['albums', 'media']) != snapshot
+
+    def test_if_none_match(self):
+        etag = CollectionVersions().etag(['projects'])
+        assert etag_matches(etag, etag)
+        assert etag_matches(f'"other", W/{etag}', etag)
+        assert etag_matches('*', etag)
+        assert not etag_matches('"other"', etag)
+        assert not etag_matches(None, etag)
@@ -0,0 +1,92 @@
+"""
+Cascade cleanup unit tests
+Tests for: last-reference removal, grace period, profile uploads
+"""
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+
+mongomock_motor = pytest.importorskip('mongomock_motor')
+
+from cleanup import FileCleanup
+from storage import LocalStorage
+
+DAY = 24 * 3600
+OLD = time.time() - 10 * DAY
+NAME = 'b' * 64 + '.jpg'
+URL = '/api/uploads/' + NAME
+
+
+def blob(name, refs=(), uploaded=OLD):
+    return {'id': name, 'refs': list(refs), 'uploadedAt': datetime.utcfromtimestamp(uploaded).isoformat()}
+
+
+def media(doc_id, url=URL):
+    return {'id': doc_id, 'url': url}
+
+
+class Cleanup:
+    """A FileCleanup over a mock database and a temporary upload directory."""
+
+    def __init__(self, directory, blobs, profile=None):
+        self.directory = directory
+        self.db = mongomock_motor.AsyncMongoMockClient()['cleanup']
+        self.cleanup = FileCleanup(LocalStorage(directory, 'secret'), grace=DAY)
+        (directory / NAME).write_bytes(b'image')
+        (directory / (NAME + '.gz')).write_bytes(b'compressed')
+
+        async def seed():
+            await self.db.blobs.insert_many(blobs)
+            if profile:
+                await self.db.profile.insert_one(profile)
+        asyncio.run(seed())
+
+    def delete(self, *docs) -> dict:
+        async def run():
+            job = self.cleanup.submit(self.db, [('media', doc) for doc in docs])
+            await self.cleanup._worker
+            return job
+        return asyncio.run(run())
+
+    def blob(self) -> dict:
+        return asyncio.run(self.db.blobs.find_one({'id': NAME}, {'_id': 0}))
+
+
+class TestFileCleanup:
+    """FileCleanup.run"""
+
+    def test_file_goes_with_its_last_reference(self, tmp_path):
+        cleanup = Cleanup(tmp_path, [blob(NAME, refs=['media:m1', 'media:m2'])])
+        job = cleanup.delete(media('m1'))
+        assert job['state'] == 'done' and job['keptFiles'] == 1 and job['removedFiles'] == 0
+        assert (tmp_path / NAME).exists()
+        assert cleanup.blob()['refs'] == ['media:m2']
+
+        job = cleanup.delete(media('m2'))
+        assert job['state'] == 'done' and job['removedFiles'] == 1
+        assert not (tmp_path / NAME).exists() and not (tmp_path / (NAME + '.gz')).exists()
+        assert cleanup.blob() is None
+
+    def test_recent_upload_is_kept_for_the_grace_period(self, tmp_path):
+        cleanup = Cleanup(tmp_path, [blob(NAME, refs=['media:m1'], uploaded=time.time() - DAY / 2)])
+        job = cleanup.delete(media('m1'))
+        assert job['removedFiles'] == 0 and job['keptFiles'] == 1
+        assert (tmp_path / NAME).exists() and cleanup.blob()['refs'] == []
+
+    def test_upload_older_than_grace_period_is_removed(self, tmp_path):
+        cleanup = Cleanup(tmp_path, [blob(NAME, refs=['media:m1'], uploaded=time.time() - 2 * DAY)])
+        job = cleanup.delete(media('m1'))
+        assert job['removedFiles'] == 1 and not (tmp_path / NAME).exists()
+
+    def test_profile_upload_is_kept(self, tmp_path):
+        cleanup = Cleanup(tmp_path, [blob(NAME, refs=['media:m1'])], profile={'avatar': URL})
+        job = cleanup.delete(media('m1'))
+        assert job['files'] == 0 and (tmp_path / NAME).exists()
+
+    def test_document_without_uploads(self, tmp_path):
+        cleanup = Cleanup(tmp_path, [blob(NAME, refs=['media:m1'])])
+        job = cleanup.delete(media('m2', url='https://example.com/photo.jpg'))
+        assert job['state'] == 'done' and job['files'] == 0
+        assert cleanup.blob()['refs'] == ['media:m1']
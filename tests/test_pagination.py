@@ -0,0 +1,68 @@
+"""
+Keyset pagination unit tests
+Tests for: cursor encoding/decoding, keyset filters
+"""
+import base64
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from pagination import decode_cursor, encode_cursor, keyset_query, sort_spec
+
+
+def raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+class TestCursor:
+    """encode_cursor / decode_cursor"""
+
+    def test_round_trip(self):
+        cursor = encode_cursor({'id': 'abc', 'date': '2024-05-01', 'title': 'ignored'}, 'date')
+        assert decode_cursor(cursor) == ('2024-05-01', 'abc')
+
+    def test_cursor_is_url_safe_without_padding(self):
+        cursor = encode_cursor({'id': '?>?>', 'createdAt': 'ÿÿ'}, 'createdAt')
+        assert '=' not in cursor and '+' not in cursor and '/' not in cursor
+        assert decode_cursor(cursor) == ('ÿÿ', '?>?>')
+
+    @pytest.mark.parametrize('cursor', [
+        'not base64!',
+        raw_cursor('just a string'),
+        raw_cursor(['2024-05-01']),
+        raw_cursor(['2024-05-01', 'a', 'b']),
+        raw_cursor([{'$gt': ''}, 'abc']),
+        raw_cursor(['2024-05-01', {'$ne': None}]),
+        raw_cursor([None, 'abc']),
+    ])
+    def test_invalid_cursor_is_rejected(self, cursor):
+        with pytest.raises(HTTPException) as error:
+            decode_cursor(cursor)
+        assert error.value.status_code == 400
+
+
+class TestKeysetQuery:
+    """keyset_query"""
+
+    def test_first_page_is_the_query(self):
+        assert keyset_query({'albumId': 'a'}, 'date', None) == {'albumId': 'a'}
+
+    def test_later_page_is_strictly_after_cursor(self):
+        cursor = encode_cursor({'id': 'm5', 'date': '2024-05-01'}, 'date')
+        assert keyset_query({}, 'date', cursor) == {'$and': [
+            {'date': {'$lte': '2024-05-01'}},
+            {'$or': [
+                {'date': {'$lt': '2024-05-01'}},
+                {'date': '2024-05-01', 'id': {'$lt': 'm5'}},
+            ]},
+        ]}
+
+    def test_later_page_keeps_the_filter(self):
+        cursor = encode_cursor({'id': 'm5', 'date': '2024-05-01'}, 'date')
+        query = keyset_query({'albumId': 'a'}, 'date', cursor)
+        assert query['$and'][0] == {'albumId': 'a'}
+        assert len(query['$and']) == 3
+
+    def test_sort_spec_breaks_ties_by_id(self):
+        assert sort_spec('date') == [('date', -1), ('id', -1)]
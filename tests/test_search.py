@@ -0,0 +1,137 @@
+"""
+Search index unit tests
+Tests for: folding, BM25 ranking, prefix expansion, incremental updates
+"""
+from search import SearchIndex, fold, tokenize
+
+
+def project(doc_id, title, description='', technologies=()):
+    return {'id': doc_id, 'title': title, 'description': description, 'technologies': list(technologies)}
+
+
+def ids(hits):
+    return [hit['id'] for hit in hits]
+
+
+class TestFolding:
+    """Diacritic and case folding"""
+
+    def test_fold_strips_romanian_diacritics(self):
+        assert fold('Știință și Tehnică') == 'stiinta si tehnica'
+        assert fold('ĂÂÎȘȚ ăâîșț') == 'aaist aaist'
+
+    def test_tokenize_splits_on_punctuation(self):
+        assert tokenize('Arduino-based, Wi-Fi (ESP32)!') == ['arduino', 'based', 'wi', 'fi', 'esp32']
+
+    def test_query_without_diacritics_finds_document_with_them(self):
+        index = SearchIndex()
+        index.add('projects', project('p1', 'Știință aplicată'))
+        assert ids(index.search('stiinta')) == ['p1']
+        assert ids(index.search('ȘTIINȚĂ')) == ['p1']
+
+
+class TestRanking:
+    """BM25 ordering"""
+
+    def test_title_match_outranks_description_match(self):
+        index = SearchIndex()
+        index.add('projects', project('body', 'Weather station', description='Uses a robot arm'))
+        index.add('projects', project('title', 'Robot arm', description='Six axis'))
+        assert ids(index.search('robot')) == ['title', 'body']
+
+    def test_rarer_term_weighs_more(self):
+        index = SearchIndex()
+        index.add('projects', project('common', 'sensor sensor board'))
+        index.add('projects', project('rare', 'sensor lidar board'))
+        index.add('projects', project('other', 'sensor board'))
+        assert ids(index.search('sensor lidar')) == ['rare']
+        assert ids(index.search('board lidar'))[0] == 'rare'
+
+    def test_every_word_must_match(self):
+        index = SearchIndex()
+        index.add('projects', project('p1', 'Robot arm'))
+        index.add('projects', project('p2', 'Robot car'))
+        assert ids(index.search('robot car')) == ['p2']
+        assert index.search('robot boat') == []
+
+    def test_filter_by_collection_and_limit(self):
+        index = SearchIndex()
+        index.add('projects', project('p1', 'Night lights'))
+        index.add('media', {'id': 'm1', 'title': 'Night city', 'category': 'street', 'albumId': 'a1'})
+        assert ids(index.search('night', collection='media')) == ['m1']
+        assert len(index.search('night', limit=1)) == 1
+
+    def test_empty_query_and_empty_index(self):
+        index = SearchIndex()
+        assert index.search('robot') == []
+        index.add('projects', project('p1', 'Robot'))
+        assert index.search('  !? ') == []
+
+
+class TestPrefix:
+    """Last-word prefix expansion"""
+
+    def test_last_word_matches_as_prefix(self):
+        index = SearchIndex()
+        index.add('projects', project('p1', 'Photography portfolio'))
+        assert ids(index.search('photo')) == ['p1']
+        assert ids(index.search('portfolio phot')) == ['p1']
+
+    def test_only_last_word_is_expanded(self):
+        index = SearchIndex()
+        index.add('projects', project('p1', 'Photography portfolio'))
+        assert index.search('photo portfolio') == []
+
+    def test_many_completions_score_like_the_best_one(self):
+        index = SearchIndex()
+        index.add('projects', project('many', 'robot robotics robots'))
+        index.add('projects', project('one', 'robot'))
+        prefix = {hit['id']: hit['score'] for hit in index.search('rob')}
+        best = {hit['id']: hit['score'] for hit in index.search('robotics')}
+        assert prefix['many'] == best['many']
+
+
+class TestIncremental:
+    """add / remove / remove_album_media keep the index consistent"""
+
+    def test_add_replaces_previous_version(self):
+        index = SearchIndex()
+        index.add('projects', project('p1', 'Old title'))
+        index.add('projects', project('p1', 'New title'))
+        assert index.search('old') == []
+        assert ids(index.search('new')) == ['p1']
+        assert len(index.documents) == 1
+
+    def test_remove_drops_terms_and_lengths(self):
+        index = SearchIndex()
+        index.add('projects', project('p1', 'Robot arm'))
+        index.add('projects', project('p2', 'Weather station'))
+        index.remove('projects', 'p1')
+        assert index.search('robot') == []
+        assert 'robot' not in index.terms and 'robot' not in index.postings
+        assert index.total_length == index.lengths[('projects', 'p2')]
+        assert index.terms == sorted(index.terms)
+
+    def test_remove_unknown_document_is_a_no_op(self):
+        index = SearchIndex()
+        index.add('projects', project('p1', 'Robot'))
+        index.remove('projects', 'missing')
+        index.remove('media', 'p1')
+        assert ids(index.search('robot')) == ['p1']
+
+    def test_remove_album_media(self):
+        index = SearchIndex()
+        index.add('media', {'id': 'm1', 'title': 'Sunset', 'category': 'nature', 'albumId': 'a1'})
+        index.add('media', {'id': 'm2', 'title': 'Sunset', 'category': 'nature', 'albumId': 'a2'})
+        index.add('projects', project('p1', 'Sunset lamp'))
+        index.remove_album_media('a1')
+        assert sorted(ids(index.search('sunset'))) == ['m2', 'p1']
+
+    def test_summary_follows_document(self):
+        index = SearchIndex()
+        index.add('media', {'id': 'm1', 'title': 'Bridge', 'category': 'city', 'url': '/api/uploads/x.jpg',
+                            'albumId': 'a1'})
+        hit = index.search('bridge')[0]
+        assert hit['type'] == 'media'
+        assert hit['image'] == '/api/uploads/x.jpg'
+        assert hit['albumId'] == 'a1'
@@ -0,0 +1,44 @@
+"""
+Upload serving unit tests
+Tests for: Range header parsing
+"""
+import pytest
+
+from static_files import RangeNotSatisfiable, parse_range
+
+
+class TestParseRange:
+    """parse_range"""
+
+    @pytest.mark.parametrize('header, expected', [
+        ('bytes=0-99', (0, 99)),
+        ('bytes=100-', (100, 999)),
+        ('bytes=-100', (900, 999)),
+        ('bytes=-5000', (0, 999)),
+        ('bytes=990-5000', (990, 999)),
+        ('bytes=999-999', (999, 999)),
+        ('BYTES = 0-0', (0, 0)),
+    ])
+    def test_satisfiable_range(self, header, expected):
+        assert parse_range(header, 1000) == expected
+
+    @pytest.mark.parametrize('header', [
+        'items=0-99',
+        'bytes=0-99,200-299',
+        'bytes=99',
+        'bytes=a-b',
+        'bytes=50-10',
+        'bytes=',
+    ])
+    def test_ignored_range_sends_whole_file(self, header):
+        assert parse_range(header, 1000) is None
+
+    @pytest.mark.parametrize('header', ['bytes=1000-', 'bytes=5000-6000', 'bytes=-0'])
+    def test_unsatisfiable_range(self, header):
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range(header, 1000)
+
+    @pytest.mark.parametrize('header', ['bytes=0-', 'bytes=0-0', 'bytes=-5', 'bytes=-1'])
+    def test_any_range_of_empty_file_is_unsatisfiable(self, header):
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range(header, 0)
@@ -0,0 +1,85 @@
+"""
+Import unit tests
+Tests for: NDJSON/JSON record readers, batch validation
+"""
+import asyncio
+import json
+
+import pytest
+
+from models import Review
+from transfer import ImportLineTooLong, MAX_IMPORT_LINE_BYTES, batched, json_records, ndjson_records, \
+    validate_batch
+
+
+def review(doc_id, **fields):
+    return json.dumps({'id': doc_id, 'name': 'Ana', 'role': 'Client', 'content': 'Great', 'rating': 5,
+                       'date': '2024-05-01', **fields}).encode()
+
+
+def collect(records):
+    async def run():
+        return [record async for record in records]
+    return asyncio.run(run())
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+class TestValidateBatch:
+    """validate_batch"""
+
+    def test_valid_batch(self):
+        valid, invalid = validate_batch(Review, [(1, review('r1')), (2, review('r2'))])
+        assert [(record, item.id) for record, item in valid] == [(1, 'r1'), (2, 'r2')]
+        assert invalid == []
+
+    def test_invalid_record_is_reported_with_its_number(self):
+        batch = [(1, review('r1')), (2, review('r2', rating=9)), (3, review('r3')), (4, b'{"id": ')]
+        valid, invalid = validate_batch(Review, batch)
+        assert [record for record, _ in valid] == [1, 3]
+        assert [record for record, _ in invalid] == [2, 4]
+        assert invalid[0][1].startswith('rating: ')
+
+    def test_missing_field_names_the_field(self):
+        raw = json.dumps({'id': 'r1', 'name': 'Ana', 'content': 'x', 'rating': 5}).encode()
+        _, invalid = validate_batch(Review, [(7, raw)])
+        assert invalid == [(7, 'role: Field required')]
+
+    def test_record_holding_two_objects_is_not_split(self):
+        # Joined into one array, this would validate as two reviews
+        valid, invalid = validate_batch(Review, [(1, review('r1') + b',' + review('r2'))])
+        assert valid == []
+        assert [record for record, _ in invalid] == [1]
+
+    def test_non_object_record(self):
+        valid, invalid = validate_batch(Review, [(1, b'[]'), (2, b'"text"')])
+        assert valid == [] and [record for record, _ in invalid] == [1, 2]
+
+
+class TestRecords:
+    """ndjson_records, json_records, batched"""
+
+    def test_ndjson_lines_across_chunks(self):
+        records = collect(ndjson_records(chunks(b'{"a":1}\n\n{"b"', b':2}\r\n  \n{"c":3}')))
+        assert records == [(1, b'{"a":1}'), (3, b'{"b":2}\r'), (5, b'{"c":3}')]
+
+    def test_ndjson_line_too_long(self):
+        with pytest.raises(ImportLineTooLong) as error:
+            collect(ndjson_records(chunks(b'{}\n', b'x' * (MAX_IMPORT_LINE_BYTES + 1))))
+        assert error.value.record == 2
+
+    def test_json_array(self):
+        records = collect(json_records(b'[{"a": 1}, {"b": [2]}]'))
+        assert [(position, json.loads(raw)) for position, raw in records] == [(1, {'a': 1}), (2, {'b': [2]})]
+
+    @pytest.mark.parametrize('body', [b'{"a": 1}', b'[{"a": 1}', b''])
+    def test_json_that_is_not_an_array(self, body):
+        with pytest.raises(ValueError):
+            json_records(body)
+
+    def test_batched(self):
+        batches = collect(batched(chunks(*range(5)), size=2))
+        assert batches == [[0, 1], [2, 3], [4]]
@@ -0,0 +1,85 @@
+"""
+Upload garbage collector unit tests
+Tests for: grace period, references, repeated uploads
+"""
+import asyncio
+import os
+import time
+from datetime import datetime
+
+import pytest
+
+mongomock_motor = pytest.importorskip('mongomock_motor')
+
+from storage import LocalStorage
+from upload_gc import UploadCollector
+
+DAY = 24 * 3600
+OLD = time.time() - 10 * DAY
+NAME = 'a' * 64 + '.txt'
+
+
+def store(directory, name, age=OLD):
+    path = directory / name
+    path.write_bytes(b'content of ' + name.encode())
+    os.utime(path, (age, age))
+    return path
+
+
+def blob(name, refs=(), uploaded=OLD):
+    return {'id': name, 'refs': list(refs), 'uploadedAt': datetime.utcfromtimestamp(uploaded).isoformat()}
+
+
+def collect(directory, blobs, **kwargs):
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()['gc']
+        if blobs:
+            await db.blobs.insert_many(blobs)
+        report = await UploadCollector(LocalStorage(directory, 'secret'), grace=DAY).run(db, **kwargs)
+        remaining = {doc['id'] for doc in await db.blobs.find({}, {'_id': 0, 'id': 1}).to_list(None)}
+        return report, remaining
+    return asyncio.run(run())
+
+
+class TestSweep:
+    """UploadCollector.run"""
+
+    def test_old_unreferenced_file_is_deleted(self, tmp_path):
+        path = store(tmp_path, NAME)
+        report, blobs = collect(tmp_path, [blob(NAME)], dry_run=False)
+        assert report['state'] == 'done' and report['deletedFiles'] == 1
+        assert not path.exists() and blobs == set()
+
+    def test_dry_run_deletes_nothing(self, tmp_path):
+        path = store(tmp_path, NAME)
+        report, blobs = collect(tmp_path, [blob(NAME)], dry_run=True)
+        assert report['files'] == [NAME] and report['deletedFiles'] == 0
+        assert path.exists() and blobs == {NAME}
+
+    def test_recent_file_is_kept(self, tmp_path):
+        path = store(tmp_path, NAME, age=time.time())
+        report, _ = collect(tmp_path, [blob(NAME, uploaded=time.time())], dry_run=False)
+        assert report['candidates'] == 0 and path.exists()
+
+    def test_referenced_blob_is_kept(self, tmp_path):
+        path = store(tmp_path, NAME)
+        report, blobs = collect(tmp_path, [blob(NAME, refs=['media:m1'])], dry_run=False)
+        assert report['deletedFiles'] == 0 and path.exists() and blobs == {NAME}
+
+    def test_reupload_within_grace_keeps_old_file(self, tmp_path):
+        # Uploading the same content again refreshes uploadedAt, not always the mtime
+        path = store(tmp_path, NAME)
+        report, blobs = collect(tmp_path, [blob(NAME, uploaded=time.time())], dry_run=False)
+        assert report['deletedFiles'] == 0 and NAME not in report['files']
+        assert path.exists() and blobs == {NAME}
+
+    def test_untracked_file_is_deleted(self, tmp_path):
+        path = store(tmp_path, NAME)
+        report, _ = collect(tmp_path, [], dry_run=False)
+        assert report['deletedFiles'] == 1 and not path.exists()
+
+    def test_sibling_goes_with_its_file(self, tmp_path):
+        path = store(tmp_path, NAME)
+        sibling = store(tmp_path, NAME + '.gz')
+        collect(tmp_path, [blob(NAME)], dry_run=False)
+        assert not path.exists() and not sibling.exists()
@@ -0,0 +1,138 @@
+"""
+Resumable upload unit tests
+Tests for: offsets, resuming, finalizing, expiry
+"""
+import asyncio
+import hashlib
+import os
+import time
+
+import pytest
+
+from uploads import UploadIncomplete, UploadOffsetMismatch, UploadSessions, UploadTooLarge, upload_name
+
+DATA = bytes(range(256)) * 40
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+async def disconnect_after(part):
+    yield part
+    raise ConnectionError('client went away')
+
+
+def append(sessions, session, offset, *parts):
+    return asyncio.run(sessions.append(session['id'], offset, chunks(*parts)))
+
+
+def age(sessions, session, seconds):
+    _, part = sessions.paths(session['id'])
+    then = time.time() - seconds
+    os.utime(part, (then, then))
+
+
+class TestAppend:
+    """UploadSessions.append"""
+
+    def test_appends_advance_the_offset(self, tmp_path):
+        sessions = UploadSessions(tmp_path)
+        session = sessions.create('photo.jpg', len(DATA))
+        assert session['offset'] == 0
+        assert append(sessions, session, 0, DATA[:1000], DATA[1000:3000])['offset'] == 3000
+        assert append(sessions, session, 3000, DATA[3000:])['offset'] == len(DATA)
+
+    def test_offset_mismatch_reports_current_offset(self, tmp_path):
+        sessions = UploadSessions(tmp_path)
+        session = sessions.create('photo.jpg', len(DATA))
+        append(sessions, session, 0, DATA[:1000])
+        with pytest.raises(UploadOffsetMismatch) as error:
+            append(sessions, session, 500, DATA[500:])
+        assert error.value.offset == 1000
+        assert sessions.get(session['id'])['offset'] == 1000
+
+    def test_resume_after_disconnect(self, tmp_path):
+        sessions = UploadSessions(tmp_path)
+        session = sessions.create('photo.jpg', len(DATA))
+        with pytest.raises(ConnectionError):
+            asyncio.run(sessions.append(session['id'], 0, disconnect_after(DATA[:1500])))
+        offset = sessions.get(session['id'])['offset']
+        assert offset == 1500
+        assert append(sessions, session, offset, DATA[offset:])['offset'] == len(DATA)
+
+    def test_more_than_declared_size_is_rejected(self, tmp_path):
+        sessions = UploadSessions(tmp_path)
+        session = sessions.create('photo.jpg', 10)
+        with pytest.raises(UploadTooLarge):
+            append(sessions, session, 0, b'x' * 11)
+
+    def test_unknown_session(self, tmp_path):
+        sessions = UploadSessions(tmp_path)
+        assert asyncio.run(sessions.append('0' * 32, 0, chunks(b'x'))) is None
+        assert sessions.get('../../etc/passwd') is None
+
+
+class TestFinalize:
+    """UploadSessions.finalize"""
+
+    def test_complete_upload_lands_at_its_content_address(self, tmp_path):
+        sessions = UploadSessions(tmp_path)
+        session = sessions.create('photo.JPEG', len(DATA))
+        append(sessions, session, 0, DATA)
+        stored = asyncio.run(sessions.finalize(session['id']))
+        assert stored.filename == upload_name(hashlib.sha256(DATA).hexdigest(), '.jpeg')
+        assert (tmp_path / stored.filename).read_bytes() == DATA
+        assert not stored.deduplicated
+        assert sessions.get(session['id']) is None
+
+    def test_incomplete_upload_is_not_finalized(self, tmp_path):
+        sessions = UploadSessions(tmp_path)
+        session = sessions.create('photo.jpg', len(DATA))
+        append(sessions, session, 0, DATA[:100])
+        with pytest.raises(UploadIncomplete):
+            asyncio.run(sessions.finalize(session['id']))
+        assert sessions.get(session['id'])['offset'] == 100
+
+    def test_same_content_is_deduplicated(self, tmp_path):
+        sessions = UploadSessions(tmp_path)
+        stored = []
+        for _ in range(2):
+            session = sessions.create('photo.jpg', len(DATA))
+            append(sessions, session, 0, DATA)
+            stored.append(asyncio.run(sessions.finalize(session['id'])))
+        assert stored[0].filename == stored[1].filename
+        assert stored[1].deduplicated
+
+
+class TestExpiry:
+    """UploadSessions.get / sweep"""
+
+    def test_expired_session_is_gone(self, tmp_path):
+        sessions = UploadSessions(tmp_path, ttl=60)
+        session = sessions.create('photo.jpg', len(DATA))
+        age(sessions, session, 61)
+        assert sessions.get(session['id']) is None
+        assert not any(sessions.directory.iterdir())
+
+    def test_sweep_removes_only_expired_sessions(self, tmp_path):
+        sessions = UploadSessions(tmp_path, ttl=60)
+        expired = sessions.create('old.jpg', len(DATA))
+        active = sessions.create('new.jpg', len(DATA))
+        age(sessions, expired, 61)
+        assert sessions.sweep() == 1
+        assert sessions.get(expired['id']) is None
+        assert sessions.get(active['id']) is not None
+
+    def test_append_extends_expiry(self, tmp_path):
+        sessions = UploadSessions(tmp_path, ttl=60)
+        session = sessions.create('photo.jpg', len(DATA))
+        age(sessions, session, 50)
+        append(sessions, session, 0, DATA[:10])
+        age_after = time.time() - sessions.paths(session['id'])[1].stat().st_mtime
+        assert age_after < 10
+        assert sessions.sweep() == 0
+
+    def test_sweep_without_sessions(self, tmp_path):
+        assert UploadSessions(tmp_path).sweep() == 0